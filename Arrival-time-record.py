@@ -1,14 +1,19 @@
 %matplotlib widget
 # Waveform Click Logger with Merge Save (既存JSONに追加)
 
-import readwin32
 import numpy as np
 import matplotlib.pyplot as plt
 from obspy import Stream, Trace, UTCDateTime
 import os
+import atexit
 import pandas as pd
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from waveform_cache import load_event, Prefetcher, events_from_catalog, window_around
+from waveform_view import LODLine, BlitManager
+from autopick import pick_traces
+from preprocess import preprocess
+from pick_journal import PickJournal, read_journal, apply_record, compact
 
 # --- 設定 ---
 csv_path = "/workspaces/固体地球物理学講座/earthquake_data/earthquake_info@sakurajima/earthquake_info@sakurajima_add.csv"
@@ -30,17 +35,7 @@ to_iterate = df_date  # 1) の場合
 # to_iterate = df_index  # 2) の場合
 
 # events_to_process の動的生成
-events_to_process = []
-for _, row in to_iterate.iterrows():
-    dt = row["time"]
-    dir_name = f"{dt.strftime('%Y%m%d_%H%M')}_{row['place'].replace(' ', '_')}"
-    datadir = os.path.join(base_dir, dir_name)
-    ch_fname = f"03_02_43_{dt.strftime('%Y%m%d')}.euc.ch"
-    ch_filepath = os.path.join(datadir, ch_fname)
-    events_to_process.append({
-        "datadir": datadir,
-        "ch_filepath": ch_filepath
-    })
+events_to_process = events_from_catalog(to_iterate, base_dir)
 
 # 確認
 for ev in events_to_process:
@@ -51,8 +46,11 @@ stations = ['v.skd2']
 components = ['u', 'n', 'e']
 
 # JSONに保存するクリックテーブル
-click_table = defaultdict(lambda: defaultdict(lambda: {"left": {c: None for c in components},
-                                                       "right": {c: None for c in components}}))
+# （記録の読み戻しと同じ形にするため普通の dict。record_pick が setdefault で埋める）
+click_table = {}
+
+# 自動読み取りの候補（click_table と同じ形。auto_click_table_summary.json に保存）
+auto_click_table = defaultdict(dict)
 
 # 新しいイベント分のクリックデータ（まだ保存してない分）
 all_click_data = {}
@@ -63,54 +61,144 @@ figures = []
 save_dir = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check"
 os.makedirs(save_dir, exist_ok=True)  # ディレクトリがなければ作成
 
-
-# === 既存JSONとマージして保存する関数 ===
+# === デコード済み波形のキャッシュ（None で無効：毎回デコード） ===
+wave_cache_dir = os.path.join(save_dir, "wave_cache")
+
+# === 波形の読み込み方 ===
+# "select"   : stations × components のチャネルと、発震時刻を基準にした load_window の秒ブロックだけデコード
+# "readwin32": ReadWin32 で cnt 全体をデコード（従来どおり）
+wave_reader = "select"
+load_window = (-30, 180)  # 発震時刻からの秒数 (前, 後)。None で記録全体
+
+# === 表示方法 ===
+# navigator = True : 3段の図1枚を使い回し、n / b キーで次 / 前の (イベント, 観測点) に波形を差し替える
+#                    最初のイベントだけ読んですぐ表示し、次の prefetch 件を裏で読み込む
+# navigator = False: 全イベントを読み込んでから イベント×観測点 ごとに図を作って全部表示（従来どおり）
+navigator = True
+prefetch = 2
+prefetch_cache = 5  # 保持する読み込み済みイベント数（LRU）
+
+# === 波形の描画 ===
+# lod_points_per_px > 0 : 表示範囲の min/max 包絡を軸の幅 1 ピクセルあたりこの点数まで描き、
+#                         拡大・移動 (xlim の変更) のたびに見えている部分を元の分解能から作り直す
+# lod_points_per_px = 0 : 全サンプルをそのまま描く（従来どおり）
+lod_points_per_px = 2
+# カーソル・ピック注釈はブリッティングで描く（波形は表示範囲が変わったときだけ描き直す）
+blit_cursor = True
+
+# === 自動読み取り（STA/LTA + AIC）の候補 ===
+# auto_pick = True : 各成分に P (left, 青) / S (right, 赤) の候補を縦線で表示する
+#                    縦線をドラッグして離すとその位置を、a キーで表示中の候補すべてを click_table に入れる
+auto_pick = True
+
+# === 前処理（トレンド除去 → テーパー → ゼロ位相 Butterworth バンドパス） ===
+# f キーで 生波形 / 前処理後 を切り替える（前処理の結果はイベント×観測点ごとに覚えておく）
+filter_band = (1.0, 10.0)   # [Hz]
+filter_order = 4
+taper_fraction = 0.05       # 両端それぞれのテーパー長（全長に対する割合）
+filter_cache_size = 16      # 覚えておく イベント×観測点 の数（LRU）
+show_filtered = False       # 起動時に前処理後を表示するか
+# f は matplotlib の全画面切り替えにも割り当てられているので外しておく
+plt.rcParams["keymap.fullscreen"] = [k for k in plt.rcParams["keymap.fullscreen"] if k != "f"]
+
+# === ピックの記録 ===
+# 1クリックごとに pick_journal_path へ1行追記して fsync する（カーネルが落ちてもピックは残る）。
+# 起動時に残っている記録を読み戻して前回のセッションを復元し、
+# journal_compact_every 件たまるか save_click_results() を実行すると
+# clicked_times.json / click_table_summary.json にまとめて記録を空にする。
+pick_journal_path = "pick_journal.jsonl"
+journal_compact_every = 100  # 0 なら save_click_results() のときだけまとめる
+
+
+# === ピックの記録を開き、まとめ直していない分を読み戻す ===
+journal = PickJournal(pick_journal_path)
+for rec in read_journal(pick_journal_path):
+    apply_record(click_table, all_click_data, rec, components)
+if journal.n_pending:
+    print(f"🔁 {pick_journal_path} から前回の {journal.n_pending} 件のピックを復元しました")
+
+
+# === 1つのピックを記録する関数（先に記録へ追記してから click_table に入れる） ===
+def record_pick(event_id, station, side, comp, x):
+    journal.append(event_id, station, side, comp, x)
+    sides = click_table.setdefault(event_id, {}).setdefault(
+        station, {"left": {c: None for c in components}, "right": {c: None for c in components}})
+    sides[side][comp] = x
+    if journal_compact_every and journal.n_pending >= journal_compact_every:
+        compact(journal, "click_table_summary.json", "clicked_times.json", components)
+
+
+# === 既存JSONとマージして保存する関数（記録をまとめ直すだけ。ピック自体はクリック時に保存済み） ===
 def save_click_results():
-    merged_click_data = {}
-    merged_table = {}
-
-    # 既存 clicked_times.json を読み込み
-    if os.path.exists("clicked_times.json"):
-        with open("clicked_times.json", "r", encoding="utf-8") as f:
-            try:
-                merged_click_data = json.load(f)
-            except json.JSONDecodeError:
-                merged_click_data = {}
-
-    # 既存 click_table_summary.json を読み込み
-    if os.path.exists("click_table_summary.json"):
-        with open("click_table_summary.json", "r", encoding="utf-8") as f:
-            try:
-                merged_table = json.load(f)
-            except json.JSONDecodeError:
-                merged_table = {}
-
-    # 新しいイベント分をマージ（既存は残し、同じイベントなら上書き）
-    for ev, stations_data in all_click_data.items():
-        if ev not in merged_click_data:
-            merged_click_data[ev] = {}
-        merged_click_data[ev].update(stations_data)
-
-    for ev, stations_data in click_table.items():
-        if ev not in merged_table:
-            merged_table[ev] = {}
-        merged_table[ev].update(stations_data)
-
-    # 上書き保存
-    with open("clicked_times.json", "w", encoding="utf-8") as f:
-        json.dump(merged_click_data, f, ensure_ascii=False, indent=2)
-
-    with open("click_table_summary.json", "w", encoding="utf-8") as f:
-        json.dump(merged_table, f, ensure_ascii=False, indent=2)
-
-    print("✅ 新しいイベントを既存データにマージして保存しました！（clicked_times.json / click_table_summary.json）")
+    n = compact(journal, "click_table_summary.json", "clicked_times.json", components)
+
+    # 自動読み取りの候補（あれば同じ形で別ファイルに）
+    if auto_click_table:
+        merged_auto = {}
+        if os.path.exists("auto_click_table_summary.json"):
+            with open("auto_click_table_summary.json", "r", encoding="utf-8") as f:
+                try:
+                    merged_auto = json.load(f)
+                except json.JSONDecodeError:
+                    merged_auto = {}
+        for ev, stations_data in auto_click_table.items():
+            merged_auto.setdefault(ev, {}).update(stations_data)
+        with open("auto_click_table_summary.json", "w", encoding="utf-8") as f:
+            json.dump(merged_auto, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ {n} 件のピックを既存データにマージして保存しました！（clicked_times.json / click_table_summary.json）")
 
 
 # === 1つの図に対してイベントハンドラを設定する関数 ===
-def setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations,
-                         left_click_times, right_click_times,
-                         event_id, station):
+# page は {"event_id", "station", "left", "right"}（ナビゲータではページを切り替えるたびに中身が変わる）
+def setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations, page):
+    # カーソル・ピック注釈だけを描き直す（False なら毎回 draw_idle で図全体）
+    blitter = BlitManager(fig.canvas, cursor_annotations) if blit_cursor else None
+
+    def redraw_annotations():
+        if blitter is not None:
+            blitter.update()
+        else:
+            fig.canvas.draw_idle()
+
+    # 自動読み取りの縦線（page["markers"] = [(線, "left"/"right", 成分), ...]）
+    def hit_marker(evt):
+        for line, side, comp in page.get("markers", []):
+            if line.axes is evt.inaxes:
+                px = line.axes.transData.transform((line.get_xdata()[0], 0))[0]
+                if abs(px - evt.x) <= 5:
+                    return line, side, comp
+        return None
+
+    def forget_annotation(side, comp):
+        """(side, comp) のピック注釈を消す（ピックを置き換えるとき）"""
+        ann = page.get("annotations", {}).pop((side, comp), None)
+        if ann is None or ann not in fixed_annotations:
+            return
+        fixed_annotations.remove(ann)
+        if blitter is not None:
+            blitter.remove_artist(ann)
+        else:
+            ann.remove()
+
+    def accept_marker(marker, replace=True):
+        """候補の位置をピックにする（replace=False なら既にピックのある成分はそのまま）"""
+        line, side, comp = marker
+        if page[side][comp] and not replace:
+            return
+        x = round(float(line.get_xdata()[0]), 3)
+        record_pick(page["event_id"], page["station"], side, comp, x)
+        if page[side][comp]:
+            forget_annotation(side, comp)
+        page[side][comp][:] = [x]
+        line.set_linestyle('-')
+
     def on_mouse_move(evt):
+        drag = page.get("drag")
+        if drag is not None:
+            (line, _, _), _ = drag
+            if evt.inaxes is line.axes and evt.xdata is not None:
+                line.set_xdata([evt.xdata, evt.xdata])
         for i, ax in enumerate(axes):
             if evt.inaxes == ax:
                 x, y = evt.xdata, evt.ydata
@@ -122,22 +210,28 @@ def setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations,
                     cursor_annotations[i].set_visible(False)
             else:
                 cursor_annotations[i].set_visible(False)
-        fig.canvas.draw_idle()
+        redraw_annotations()
 
     def on_click(evt):
+        # 候補の縦線をつかんだらドラッグ開始（page["drag"] = (候補, つかんだときの位置)）
+        marker = hit_marker(evt) if evt.button == 1 else None
+        if marker is not None:
+            page["drag"] = (marker, marker[0].get_xdata()[0])
+            return
         for i, ax in enumerate(axes):
             if evt.inaxes == ax:
                 x, y = evt.xdata, evt.ydata
                 if x is not None and y is not None:
                     comp = components[i]
+                    event_id, station = page["event_id"], page["station"]
                     # 左クリック (1)
-                    if evt.button == 1 and len(left_click_times[comp]) < 1:
-                        left_click_times[comp].append(round(x, 3))
-                        click_table[event_id][station]["left"][comp] = round(x, 3)
+                    if evt.button == 1 and len(page["left"][comp]) < 1:
+                        page["left"][comp].append(round(x, 3))
+                        record_pick(event_id, station, "left", comp, round(x, 3))
                     # 右クリック (3)
-                    elif evt.button == 3 and len(right_click_times[comp]) < 1:
-                        right_click_times[comp].append(round(x, 3))
-                        click_table[event_id][station]["right"][comp] = round(x, 3)
+                    elif evt.button == 3 and len(page["right"][comp]) < 1:
+                        page["right"][comp].append(round(x, 3))
+                        record_pick(event_id, station, "right", comp, round(x, 3))
                     else:
                         return
                     ann = ax.annotate(f"{x:.3f} s", xy=(x, y), xytext=(20, 20),
@@ -145,16 +239,47 @@ def setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations,
                                       bbox=dict(boxstyle="round", fc="lightyellow"),
                                       arrowprops=dict(arrowstyle="->"))
                     fixed_annotations.append(ann)
-                fig.canvas.draw_idle()
+                    side = "left" if evt.button == 1 else "right"
+                    page.setdefault("annotations", {})[(side, comp)] = ann
+                    if blitter is not None:
+                        blitter.add_artist(ann)
+                redraw_annotations()
+
+    def on_release(evt):
+        # 動かさずに離した（クリックしただけ）ならピックにしない
+        drag = page.pop("drag", None)
+        if drag is None:
+            return
+        marker, x0 = drag
+        if marker[0].get_xdata()[0] != x0:
+            accept_marker(marker)
+            redraw_annotations()
 
     def on_key(evt):
         key = evt.key
+        # f で 生波形 / 前処理後 の切り替え
+        if key == 'f':
+            toggle_filtered()
+            return
+        # a で表示中の候補を、まだピックのない成分にだけ採用
+        if key == 'a':
+            for marker in page.get("markers", []):
+                accept_marker(marker, replace=False)
+            redraw_annotations()
+            return
+        # n / b で次 / 前のページ（ナビゲータ）
+        if key in ['n', 'b'] and navigator:
+            navigate(1 if key == 'n' else -1)
         # Deleteで注釈削除
-        if key == 'delete':
+        elif key == 'delete':
             for ann in fixed_annotations:
-                ann.remove()
+                if blitter is not None:
+                    blitter.remove_artist(ann)
+                else:
+                    ann.remove()
             fixed_annotations.clear()
-            fig.canvas.draw_idle()
+            page.pop("annotations", None)
+            redraw_annotations()
         # ←→↑↓で時間軸操作
         elif key in ['right', 'left', 'up', 'down']:
             base_ax = axes[0]
@@ -189,85 +314,323 @@ def setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations,
 
     fig.canvas.mpl_connect("motion_notify_event", on_mouse_move)
     fig.canvas.mpl_connect("button_press_event", on_click)
+    fig.canvas.mpl_connect("button_release_event", on_release)
     fig.canvas.mpl_connect("key_press_event", on_key)
+    return blitter
+
+
+# === 前処理後の波形（イベント×観測点ごとに覚えておく） ===
+filtered_cache = OrderedDict()
+# 表示中のページ（f キーで描き直す対象）
+open_pages = []
+
+
+def filtered_traces(event_id, station, waveform_data, sr):
+    key = (event_id, station, tuple(filter_band), filter_order, taper_fraction)
+    if key in filtered_cache:
+        filtered_cache.move_to_end(key)
+        return filtered_cache[key]
+    comps = [c for c in components if waveform_data[c] is not None]
+    # 3成分をまとめて1回で処理
+    y = preprocess(np.stack([np.asarray(waveform_data[c], dtype=float) for c in comps]), sr,
+                   filter_band, filter_order, taper_fraction)
+    out = {c: None for c in components}
+    out.update(zip(comps, y))
+    filtered_cache[key] = out
+    while len(filtered_cache) > filter_cache_size:
+        filtered_cache.popitem(last=False)
+    return out
+
+
+def view_traces(page, filtered=None):
+    """ページに表示する波形（filtered（省略時は show_filtered）に応じて生波形か前処理後）"""
+    waveform_data, sr, _ = page["traces"]
+    if filtered is None:
+        filtered = show_filtered
+    if not filtered:
+        return waveform_data
+    return filtered_traces(page["event_id"], page["station"], waveform_data, sr)
+
+
+def redraw_traces(page, reset_view, filtered=None):
+    """page["lines"] の波形を view_traces のものに差し替え、縦軸を合わせ直す（成分がない段は飛ばす）"""
+    _, sr, start = page["traces"]
+    for line, data in zip(page["lines"], view_traces(page, filtered).values()):
+        if line is None or data is None:
+            continue
+        line.set_waveform(data, sr, start, reset_view=reset_view)
+        ax = line.ax
+        ax.set_autoscaley_on(True)
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
+
+
+def toggle_filtered():
+    global show_filtered
+    filtered = not show_filtered
+    for page in open_pages:
+        if "traces" not in page:
+            continue
+        redraw_traces(page, reset_view=False, filtered=filtered)
+        page["fig"].canvas.draw_idle()
+    # 描き直しが終わってから切り替える（途中で失敗しても表示と状態が食い違わないように）
+    show_filtered = filtered
+    print("表示: " + (f"前処理後 {filter_band[0]}-{filter_band[1]} Hz" if show_filtered else "生波形"))
+
+
+# === 自動読み取りの候補を縦線で描く ===
+def draw_auto_markers(axes, page, blitter, waveform_data, sr, start):
+    """候補を計算して auto_click_table に入れ、page["markers"] の縦線を作り直す"""
+    for line, _, _ in page.pop("markers", []):
+        if blitter is not None:
+            blitter.remove_artist(line)
+        else:
+            line.remove()
+    if not auto_pick:
+        return
+    auto = pick_traces(waveform_data, sr, start)
+    auto_click_table[page["event_id"]][page["station"]] = auto
+    markers = []
+    for i, comp in enumerate(components):
+        for side, color in [("left", 'tab:blue'), ("right", 'tab:red')]:
+            x = auto[side][comp]
+            if x is None:
+                continue
+            line = axes[i].axvline(x, color=color, linestyle='--', linewidth=1.2)
+            markers.append((line, side, comp))
+            if blitter is not None:
+                blitter.add_artist(line)
+    page["markers"] = markers
+
+
+# === 1イベント分の波形読み込み ===
+def load_waves(event):
+    keys = [f"{station}.{comp}" for station in stations for comp in components]
+    return load_event(event['datadir'], event['ch_filepath'], keys, cache_dir=wave_cache_dir,
+                      reader=wave_reader, window=window_around(event["time"], load_window))
+
+
+# === 1観測点分の3成分（表示する長さにそろえる） ===
+def station_traces(waves, station):
+    """({成分: 波形 または None}, サンプリングレート, 開始秒) を返す。どの成分もなければ None
+
+    時刻は記録開始からの秒数（読み込み範囲を絞っても従来のピックと同じ時間軸）。
+    """
+    waveform_data = {}
+    sampling_rates = {}
+    start_times = {}
+    minlen = float('inf')
+
+    for comp in components:
+        key = f"{station}.{comp}"
+        if waves[key] is not None:
+            data, sr, start = waves[key]
+            waveform_data[comp] = data
+            sampling_rates[comp] = sr
+            start_times[comp] = start
+            minlen = min(minlen, len(data))
+        else:
+            waveform_data[comp] = None
+
+    if minlen == float('inf'):
+        return None
+    waveform_data = {comp: (None if d is None else d[:minlen]) for comp, d in waveform_data.items()}
+    return waveform_data, list(sampling_rates.values())[0], list(start_times.values())[0]
+
+
+# === クリックの記録先（前に開いたことのあるイベントなら、そのときのクリックを引き継ぐ） ===
+def click_page(event_id, station):
+    clicks = all_click_data.setdefault(event_id, {}).setdefault(station, {
+        "left": {comp: [] for comp in components},
+        "right": {comp: [] for comp in components}
+    })
+    return {"event_id": event_id, "station": station,
+            "left": clicks["left"], "right": clicks["right"]}
 
 
-# === メイン処理 ===
-for event in events_to_process:
-    datadir = event['datadir']
-    ch_filepath = event['ch_filepath']
-    event_id = os.path.basename(datadir)
+# === 3成分の図の枠（カーソル注釈つき） ===
+def make_figure():
+    fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(10, 6), sharex=True)
+    cursor_annotations = []
+    for ax in axes:
+        annotation = ax.annotate('', xy=(0, 0), xytext=(20, 20),
+                                 textcoords='offset points', fontsize=9,
+                                 bbox=dict(boxstyle="round", fc="w"),
+                                 arrowprops=dict(arrowstyle="->"))
+        annotation.set_visible(False)
+        cursor_annotations.append(annotation)
+    return fig, axes, cursor_annotations
 
-    try:
-        filedata = readwin32.ReadWin32(os.path.join(datadir, '*cnt'), ch=ch_filepath)
-    except Exception as e:
-        print(f"Error loading event {event_id}: {e}")
-        continue
 
-    all_click_data[event_id] = {}
+# === 1イベント分の図を作る（イベント×観測点ごとに1枚） ===
+def plot_event(event_id, waves):
+    event_figures = []
 
     for station in stations:
-        fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(10, 6), sharex=True)
-        fig.suptitle(f"Event: {event_id} | Station: {station}", fontsize=14)
-        figures.append((fig, axes))
-
-        waveform_data = {}
-        sampling_rates = {}
-        minlen = float('inf')
-
-        for comp in components:
-            key = f"{station}.{comp}"
-            try:
-                data, sr = filedata.get_data(key)
-                waveform_data[comp] = data
-                sampling_rates[comp] = sr
-                minlen = min(minlen, len(data))
-            except:
-                waveform_data[comp] = None
-
-        if minlen == float('inf'):
-            plt.close(fig)
+        traces = station_traces(waves, station)
+        if traces is None:
             continue
+        waveform_data, sr0, t0 = traces
 
-        t = np.arange(minlen) / list(sampling_rates.values())[0]
-
-        cursor_annotations = []
-        fixed_annotations = []
-
-        left_click_times = {comp: [] for comp in components}
-        right_click_times = {comp: [] for comp in components}
+        fig, axes, cursor_annotations = make_figure()
+        fig.suptitle(f"Event: {event_id} | Station: {station}", fontsize=14)
+        event_figures.append((fig, axes))
 
+        page = click_page(event_id, station)
+        page["traces"] = traces
+        shown = view_traces(page)
+        lines = []
         for i, comp in enumerate(components):
             ax = axes[i]
             if waveform_data[comp] is not None:
-                ax.plot(t, waveform_data[comp][:minlen], color='black')
+                # lod_points_per_px = 0 なら間引かずに全サンプル
+                lines.append(LODLine(ax, shown[comp], sr0, t0,
+                                     points_per_px=lod_points_per_px, color='black'))
                 ax.set_ylabel(comp.upper())
                 ax.grid(True)
             else:
+                lines.append(None)
                 ax.text(0.5, 0.5, "No Data", ha='center', va='center', transform=ax.transAxes)
-
-            annotation = ax.annotate('', xy=(0, 0), xytext=(20, 20),
-                                     textcoords='offset points', fontsize=9,
-                                     bbox=dict(boxstyle="round", fc="w"),
-                                     arrowprops=dict(arrowstyle="->"))
-            annotation.set_visible(False)
-            cursor_annotations.append(annotation)
+        page["lines"] = lines
+        page["fig"] = fig
+        open_pages.append(page)
 
         # イベントハンドラ設定
-        setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations,
-                             left_click_times, right_click_times,
-                             event_id, station)
-
-        # 保存対象のクリックデータを格納
-        all_click_data[event_id][station] = {
-            "left": left_click_times,
-            "right": right_click_times
-        }
+        blitter = setup_event_handlers(fig, axes, cursor_annotations, [], page)
+        draw_auto_markers(axes, page, blitter, waveform_data, sr0, t0)
 
         plt.tight_layout(rect=[0, 0.03, 1, 0.95])
 
-# すべての図を表示
-for fig, _ in figures:
-    fig.show()
+    return event_figures
+
+
+# === ナビゲータ：3段の図1枚を使い回し、(イベント, 観測点) を n / b キーで切り替える ===
+nav = {}
+
+
+def open_navigator():
+    fig, axes, cursor_annotations = make_figure()
+    page = {}
+    fixed_annotations = []
+    blitter = setup_event_handlers(fig, axes, cursor_annotations, fixed_annotations, page)
+    no_data = []
+    for ax, comp in zip(axes, components):
+        ax.set_ylabel(comp.upper())
+        ax.grid(True)
+        no_data.append(ax.text(0.5, 0.5, "No Data", ha='center', va='center',
+                               transform=ax.transAxes, visible=False))
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    figures.append((fig, axes))
+    open_pages.append(page)
+    # index はまだ何も表示していないとき -1（n で先頭から、b は「これ以上ない」）
+    nav.update(fig=fig, axes=axes, page=page, fixed=fixed_annotations, blitter=blitter,
+               lines=[None] * len(components), no_data=no_data, index=-1,
+               pages=[(i, station) for i in range(len(events_to_process)) for station in stations])
+
+
+def _annotate_pick(ax, x, line):
+    """保存済みのピックを波形上に注釈する（再訪したとき用）"""
+    xd, yd = line.line.get_data()
+    y = np.interp(x, xd, yd) if len(xd) else 0.0
+    return ax.annotate(f"{x:.3f} s", xy=(x, y), xytext=(20, 20),
+                       textcoords='offset points', fontsize=9,
+                       bbox=dict(boxstyle="round", fc="lightyellow"),
+                       arrowprops=dict(arrowstyle="->"))
+
+
+def show_page(index, step=1):
+    pages = nav["pages"]
+    while 0 <= index < len(pages):
+        event_index, station = pages[index]
+        event_id = os.path.basename(events_to_process[event_index]['datadir'])
+        try:
+            waves = prefetcher.get(event_index)
+        except Exception as e:
+            print(f"Error loading event {event_id}: {e}")
+            # 同じイベントの他の観測点も飛ばす
+            while 0 <= index < len(pages) and pages[index][0] == event_index:
+                index += step
+            continue
+        traces = station_traces(waves, station)
+        if traces is None:
+            index += step
+            continue
+        break
+    else:
+        print("これ以上イベントはありません。")
+        return
+    waveform_data, sr0, t0 = traces
+
+    # 前のページのピック注釈を消し、波形を差し替える
+    for ann in nav["fixed"]:
+        if nav["blitter"] is not None:
+            nav["blitter"].remove_artist(ann)
+        else:
+            ann.remove()
+    nav["fixed"].clear()
+    markers = nav["page"].get("markers", [])
+    nav["page"].clear()
+    nav["page"].update(click_page(event_id, station), markers=markers, traces=traces,
+                       lines=nav["lines"], fig=nav["fig"])
+    shown = view_traces(nav["page"])
+    fig, axes = nav["fig"], nav["axes"]
+    fig.suptitle(f"Event: {event_id} | Station: {station}", fontsize=14)
+    for i, comp in enumerate(components):
+        ax, line = axes[i], nav["lines"][i]
+        data = shown[comp]
+        nav["no_data"][i].set_visible(data is None)
+        if data is None:
+            if line is not None:
+                line.line.set_visible(False)
+            continue
+        if line is None:
+            nav["lines"][i] = line = LODLine(ax, data, sr0, t0, points_per_px=lod_points_per_px,
+                                             color='black')
+        else:
+            line.set_waveform(data, sr0, t0)
+            line.line.set_visible(True)
+        ax.set_autoscaley_on(True)
+        ax.relim(visible_only=True)
+        ax.autoscale_view(scalex=False)
+        for side in ["left", "right"]:
+            for x in nav["page"][side][comp]:
+                ann = _annotate_pick(ax, x, line)
+                nav["fixed"].append(ann)
+                nav["page"].setdefault("annotations", {})[(side, comp)] = ann
+                if nav["blitter"] is not None:
+                    nav["blitter"].add_artist(ann)
+    draw_auto_markers(axes, nav["page"], nav["blitter"], waveform_data, sr0, t0)
+    nav["index"] = index
+    fig.canvas.draw_idle()
+    print(f"[{index + 1}/{len(pages)}] {event_id} | {station}")
+
+
+def navigate(step):
+    show_page(nav["index"] + step, step)
+
+
+# === メイン処理 ===
+if navigator:
+    prefetcher = Prefetcher(lambda i: load_waves(events_to_process[i]), len(events_to_process),
+                            depth=prefetch, max_events=prefetch_cache)
+    open_navigator()
+    # 図を閉じたとき・終了するときに先読みのスレッドを止める
+    nav["fig"].canvas.mpl_connect("close_event", lambda evt: prefetcher.close())
+    atexit.register(prefetcher.close)
+    show_page(0)
+    nav["fig"].show()
+else:
+    for event in events_to_process:
+        event_id = os.path.basename(event['datadir'])
+        try:
+            waves = load_waves(event)
+        except Exception as e:
+            print(f"Error loading event {event_id}: {e}")
+            continue
+        figures.extend(plot_event(event_id, waves))
+
+    # すべての図を表示
+    for fig, _ in figures:
+        fig.show()
 
-print("\n💡 クリックが終わったら `save_click_results()` を実行すると、既存JSONにマージして保存されます。")
+print("\n💡 ピックはクリックごとに pick_journal.jsonl に保存されます。`save_click_results()` を実行すると既存JSONにまとめて保存されます。")
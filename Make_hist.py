@@ -1,18 +1,22 @@
-import json
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from pick_store import open_store, sync, load_delta_table, DELTA_COLS
+from hist_cache import content_key, OutputCache
 
 # JSON ファイルのパス
 json_path = "click_table_summary.json"
-
-# JSON 読み込み（存在しない場合は空辞書）
+# 取り込み先の SQLite（JSON が変わったときだけ取り込み直す）
+store_path = "picks.sqlite"
+# 差分表の列指向ファイル（ストアが変わったときだけ書き直す）
+arrow_path = "all_stations_delta_table.arrow"
+# 前回書いた出力のキー（中身が変わっていない観測点の CSV / PNG は書き直さない）
+manifest_path = "hist_manifest.json"
+
+conn = open_store(store_path)
 if os.path.exists(json_path):
-    with open(json_path, "r", encoding="utf-8") as f:
-        click_data = json.load(f)
-else:
-    click_data = {}
+    sync(conn, json_path)
 
 stations = ['v.ska2', 'v.sft2', 'v.skd2', 'v.skrd', 'v.skrb', 'v.skrc']
 components = ['u', 'n', 'e']
@@ -20,9 +24,9 @@ components = ['u', 'n', 'e']
 # ヒストグラムのビン幅（横軸の幅）をここで調整してください
 bin_width = 0.05  # 例：0.5秒刻み、適宜変更
 
-# --- 差分を計算する関数 ---
-def diff(a, b):
-    return (a - b) if (a is not None and b is not None) else np.nan
+# raw + diff の全観測点分（列指向ファイルから読む）
+delta_df = load_delta_table(conn, arrow_path, stations, raw=True, classes=())
+cache = OutputCache(manifest_path)
 
 # 観測点ごとの DataFrame を格納する辞書
 station_dfs = {}
@@ -31,51 +35,12 @@ all_rows = []
 
 # ===== 観測点ごとの処理 =====
 for station in stations:
-    rows = []
-
-    for event_name, event_data in click_data.items():
-        if station not in event_data:
-            continue
-        
-        station_data = event_data[station]
-
-        # 左クリック raw
-        left_u = station_data["left"]["u"]
-        left_n = station_data["left"]["n"]
-        left_e = station_data["left"]["e"]
-
-        # 右クリック raw
-        right_u = station_data["right"]["u"]
-        right_n = station_data["right"]["n"]
-        right_e = station_data["right"]["e"]
-
-        # 差分計算
-        left_un  = diff(left_n, left_u)
-        left_ue  = diff(left_e, left_u)
-        right_un = diff(right_n, right_u)
-        right_ue = diff(right_e, right_u)
-
-        # 観測点ごと用の行（raw + diff 両方）
-        rows.append({
-            "Event": event_name,
-            "left_u": left_u, "left_n": left_n, "left_e": left_e,
-            "right_u": right_u, "right_n": right_n, "right_e": right_e,
-            "left_n-u": left_un, "left_e-u": left_ue,
-            "right_n-u": right_un, "right_e-u": right_ue
-        })
-
-        # 全観測点まとめ用の行（stationも含める）
-        all_rows.append({
-            "Station": station,
-            "Event": event_name,
-            "left_u": left_u, "left_n": left_n, "left_e": left_e,
-            "right_u": right_u, "right_n": right_n, "right_e": right_e,
-            "left_n-u": left_un, "left_e-u": left_ue,
-            "right_n-u": right_un, "right_e-u": right_ue
-        })
+    df = delta_df[delta_df["Station"] == station].reset_index(drop=True)
+    # 全観測点まとめ用（stationも含める）
+    all_rows.append(df)
 
     # ---- 観測点ごとの DataFrame ----
-    df = pd.DataFrame(rows)
+    df = df.drop(columns="Station")
     station_dfs[station] = df
 
     print(f"\n=== {station} の Δ表（raw + diff）===")
@@ -83,11 +48,20 @@ for station in stations:
 
     # ---- CSV で保存 ----
     csv_name = f"delta_{station.replace('.', '_')}.csv"
-    df.to_csv(csv_name, index=False)
-    print(f"✅ {csv_name} を保存しました")
-
-    # ---- 観測点ごとのヒストグラム ----
-    if not df.empty:
+    csv_key = content_key(df, list(df.columns), ordered=True)
+    if cache.is_current(csv_name, csv_key):
+        print(f"⏭ {csv_name} は変わっていません")
+    else:
+        df.to_csv(csv_name, index=False)
+        cache.mark(csv_name, csv_key)
+        print(f"✅ {csv_name} を保存しました")
+
+    # ---- 観測点ごとのヒストグラム（差分の中身が変わったときだけ描き直す） ----
+    img_name = f"hist_{station.replace('.', '_')}.png"
+    hist_key = content_key(df, DELTA_COLS, station, bin_width)
+    if not df.empty and cache.is_current(img_name, hist_key):
+        print(f"⏭ {img_name} は変わっていません")
+    elif not df.empty:
         fig, axes = plt.subplots(2, 2, figsize=(10, 6))
         fig.suptitle(f"{station} Δ histogram")
 
@@ -117,23 +91,31 @@ for station in stations:
         plt.tight_layout(rect=[0, 0.03, 1, 0.95])  # suptitle 分スペース確保
 
         # 画像保存
-        img_name = f"hist_{station.replace('.', '_')}.png"
         plt.savefig(img_name, dpi=200)
+        cache.mark(img_name, hist_key)
         print(f"📊 {img_name} を保存しました")
 
         plt.show()
 
 # ===== 6観測点まとめ版 =====
-all_df = pd.DataFrame(all_rows)
+all_df = pd.concat(all_rows, ignore_index=True)
 print("\n=== 全観測点まとめ版 Δ表（raw + diff）===")
 print(all_df)
 
 # CSV で保存
-all_df.to_csv("all_stations_delta_table.csv", index=False)
-print("✅ all_stations_delta_table.csv を保存しました")
-
-# ---- まとめヒストグラム ----
-if not all_df.empty:
+all_key = content_key(all_df, list(all_df.columns), ordered=True)
+if cache.is_current("all_stations_delta_table.csv", all_key):
+    print("⏭ all_stations_delta_table.csv は変わっていません")
+else:
+    all_df.to_csv("all_stations_delta_table.csv", index=False)
+    cache.mark("all_stations_delta_table.csv", all_key)
+    print("✅ all_stations_delta_table.csv を保存しました")
+
+# ---- まとめヒストグラム（差分の中身が変わったときだけ描き直す） ----
+hist_key = content_key(all_df, DELTA_COLS, "all", bin_width)
+if not all_df.empty and cache.is_current("hist_all_stations.png", hist_key):
+    print("⏭ hist_all_stations.png は変わっていません")
+elif not all_df.empty:
     fig, axes = plt.subplots(2, 2, figsize=(10, 6))
     fig.suptitle("All Stations Δ histogram")
 
@@ -162,6 +144,9 @@ if not all_df.empty:
 
     # まとめヒストグラム保存
     plt.savefig("hist_all_stations.png", dpi=200)
+    cache.mark("hist_all_stations.png", hist_key)
     print("📊 hist_all_stations.png を保存しました")
 
     plt.show()
+
+cache.save()
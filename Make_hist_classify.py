@@ -1,77 +1,51 @@
-import json
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
 import sys
 from matplotlib.ticker import MaxNLocator
+from pick_store import open_store, sync, load_delta_table
+from hist_cache import content_key, OutputCache
 
 # ==== ユーザー設定 ====
 # クリックデータ JSON
 json_path = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check/click_table_summary.json"
 # 分類データ CSV
 class_csv = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/classify/station_event_classification.csv"
+# クリックデータ・分類を取り込む SQLite
+store_path = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check/picks.sqlite"
+# 差分表の列指向ファイル（ストアが変わったときだけ書き直す）
+arrow_path = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check/all_stations_delta_table.arrow"
 # ヒストグラムのビン幅（単位は秒など、適宜変更）
 bin_width = 0.05
+# 前回書いた出力のキー（中身が変わっていないグループの PNG / CSV は書き直さない）
+manifest_path = "hist_manifest.json"
 
-# ==== 1) クリックデータ読み込み ====
+# ==== 1) 入力ファイルの確認 ====
 if not os.path.exists(json_path):
     print(f"Error: JSONファイルが見つかりません: {json_path}", file=sys.stderr)
     sys.exit(1)
-with open(json_path, "r", encoding="utf-8") as f:
-    click_data = json.load(f)
-
-# ==== 2) 分類CSV読み込み & カラム名リネーム ====
 if not os.path.exists(class_csv):
     print(f"Error: 分類CSVが見つかりません: {class_csv}", file=sys.stderr)
     sys.exit(1)
-df_class = pd.read_csv(class_csv, encoding="utf-8")
-# カラム名自動検出 & リネーム
-colmap = {}
-if "station_name" in df_class.columns: colmap["station_name"] = "Station"
-elif "Station" in df_class.columns: colmap["Station"] = "Station"
-else: raise KeyError("分類CSVに'station_name'または'Station'がありません")
-if "place" in df_class.columns: colmap["place"] = "Event"
-elif "Event" in df_class.columns: colmap["Event"] = "Event"
-else: raise KeyError("分類CSVに'place'または'Event'がありません")
-if "azimuth_class" in df_class.columns: colmap["azimuth_class"] = "AzimuthClass"
-elif "AzimuthClass" in df_class.columns: colmap["AzimuthClass"] = "AzimuthClass"
-else: raise KeyError("分類CSVに'azimuth_class'または'AzimuthClass'がありません")
-if "dip_class" in df_class.columns: colmap["dip_class"] = "DipClass"
-elif "DipClass" in df_class.columns: colmap["DipClass"] = "DipClass"
-else: raise KeyError("分類CSVに'dip_class'または'DipClass'がありません")
-df_class = df_class.rename(columns=colmap)
-df_class = df_class.drop_duplicates(subset=["Station","Event"], keep="first")
 
-# ==== 3) クリック差分の flatten ====
-stations = ['v.ska2', 'v.sft2', 'v.skd2', 'v.skrd', 'v.skrb', 'v.skrc']
-def diff(a, b): return (a - b) if (a is not None and b is not None) else np.nan
-rows = []
-for event, ev in click_data.items():
-    for station in stations:
-        if station not in ev: continue
-        sd = ev[station]
-        lu, ln, le = sd["left"].get("u"), sd["left"].get("n"), sd["left"].get("e")
-        ru, rn, re = sd["right"].get("u"), sd["right"].get("n"), sd["right"].get("e")
-        rows.append({
-            "Station":    station,
-            "Event":      event,
-            "left_n-u":   diff(ln, lu),
-            "left_e-u":   diff(le, lu),
-            "right_n-u":  diff(rn, ru),
-            "right_e-u":  diff(re, ru),
-        })
-all_df = pd.DataFrame(rows)
-all_df.to_csv("all_stations_delta_table.csv", index=False)
+# ==== 2) SQLite に取り込み（前回から変わったファイルだけ） ====
+conn = open_store(store_path)
+sync(conn, json_path, class_csv)
 
-# ==== 4) マージ ====
-merged = pd.merge(
-    all_df,
-    df_class[["Station","Event","AzimuthClass","DipClass"]],
-    on=["Station","Event"], how="left", validate="m:1"
-)
+# ==== 3) クリック差分 + 方位・仰角クラス（ストアから書き出した列指向ファイルを読む） ====
+stations = ['v.ska2', 'v.sft2', 'v.skd2', 'v.skrd', 'v.skrb', 'v.skrc']
+merged = load_delta_table(conn, arrow_path, stations, classes=("AzimuthClass", "DipClass"))
+# 行の並びは従来どおり イベント順 → その中で stations の順（ストアの並びは JSON での観測点順）
+station_rank = merged["Station"].astype(str).map({s: i for i, s in enumerate(stations)}).to_numpy()
+merged = merged.iloc[np.lexsort((station_rank, merged["Event"].factorize()[0]))].reset_index(drop=True)
+cache = OutputCache(manifest_path)
+all_df = merged.drop(columns=["AzimuthClass", "DipClass"])
+all_key = content_key(all_df, list(all_df.columns), ordered=True)
+if not cache.is_current("all_stations_delta_table.csv", all_key):
+    all_df.to_csv("all_stations_delta_table.csv", index=False)
+    cache.mark("all_stations_delta_table.csv", all_key)
 
-# ==== 5) 統一レンジでヒストグラム描画関数 ====
+# ==== 4) 統一レンジでヒストグラム描画関数 ====
 def plot_group_hist(df, group_col, prefix):
     params = [
         ("left_n-u",  "Left Δ(n-u)"),
@@ -81,6 +55,12 @@ def plot_group_hist(df, group_col, prefix):
     ]
     for cls in df[group_col].dropna().unique():
         sub = df[df[group_col] == cls]
+        # グループの中身（差分の値）が前回と同じなら描き直さない
+        fname = f"{prefix}_{group_col}_{cls}.png".replace(" ","_")
+        key = content_key(sub, [col for col, _ in params], group_col, cls, bin_width)
+        if cache.is_current(fname, key):
+            print(f"⏭ {fname} は変わっていません")
+            continue
         # 全データで bins 共通化
         all_vals = []
         for col, _ in params:
@@ -113,11 +93,12 @@ def plot_group_hist(df, group_col, prefix):
             ax.set_ylabel("Count")
             ax.yaxis.set_major_locator(MaxNLocator(integer=True))
         plt.tight_layout(rect=[0,0.03,1,0.95])
-        fname = f"{prefix}_{group_col}_{cls}.png".replace(" ","_")
         plt.savefig(fname, dpi=200)
+        cache.mark(fname, key)
         print(f"📊 {fname} を保存しました")
         plt.close(fig)
 
-# ==== 6) 方位・仰角クラス別描画 ====
+# ==== 5) 方位・仰角クラス別描画 ====
 plot_group_hist(merged, "AzimuthClass", "hist_by_azimuth")
 plot_group_hist(merged, "DipClass",     "hist_by_dip")
+cache.save()
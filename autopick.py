@@ -0,0 +1,141 @@
+import time
+import numpy as np
+
+# ===== 自動読み取りの設定 =====
+STA_S = 0.5         # 短時間平均の窓 [s]
+LTA_S = 10.0        # 長時間平均の窓 [s]
+P_ON = 4.0          # P のトリガ閾値 (STA/LTA)
+AIC_BEFORE_S = 3.0  # P の立ち上がりを AIC で探す窓（トリガの前 / 後）[s]
+AIC_AFTER_S = 1.0
+MIN_SP_S = 1.0      # S を探す窓（P の何秒後から何秒後まで）
+MAX_SP_S = 30.0
+
+# ===== STA/LTA（累積和で全サンプルまとめて） =====
+def sta_lta(x, sr, sta_s=STA_S, lta_s=LTA_S):
+    """x (..., n) の STA/LTA 比（後ろ向きの窓、LTA が揃うまでの先頭は 0）"""
+    x = np.asarray(x, dtype=float)
+    x = np.nan_to_num(x - np.nanmean(x, axis=-1, keepdims=True))
+    nsta, nlta = max(int(sta_s * sr), 1), max(int(lta_s * sr), 1)
+    c = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    np.cumsum(x * x, axis=-1, out=c[..., 1:])
+    ratio = np.zeros(x.shape)
+    if x.shape[-1] < nlta:
+        return ratio
+    sta = (c[..., nlta:] - c[..., nlta - nsta:-nsta]) / nsta
+    lta = (c[..., nlta:] - c[..., :-nlta]) / nlta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio[..., nlta - 1:] = np.where(lta > 0, sta / lta, 0.0)
+    return ratio
+
+def first_trigger(ratio, on, start_idx=0):
+    """各行で start_idx 以降に初めて ratio > on となる位置（なければ -1）"""
+    n = ratio.shape[-1]
+    start_idx = np.broadcast_to(np.asarray(start_idx), ratio.shape[:-1])
+    above = (ratio > on) & (np.arange(n) >= start_idx[..., None])
+    return np.where(above.any(axis=-1), above.argmax(axis=-1), -1)
+
+# ===== AIC（Maeda 1985）による立ち上がり =====
+def aic_onset(x, lo, hi):
+    """各行の [lo, hi) で AIC が最小になる位置（lo < 0 の行・候補がない行は -1）
+
+    AIC(k) = k log var(x[lo:k]) + (hi - k - 1) log var(x[k:hi]) を累積和で一度に計算する。
+    """
+    x = np.nan_to_num(np.asarray(x, dtype=float))
+    lo = np.asarray(lo)
+    hi = np.asarray(hi)
+    w = int(max(np.max(hi - lo, initial=0), 0))
+    if w < 4:
+        return np.full(lo.shape, -1)
+    # 行ごとの窓を (..., w) に切り出す（範囲外は端の値）
+    idx = np.clip(lo[..., None] + np.arange(w), 0, x.shape[-1] - 1)
+    seg = np.take_along_axis(x, idx, axis=-1)
+    valid = np.arange(w) < (hi - lo)[..., None]
+    seg = np.where(valid, seg, 0.0)
+    m = np.clip(hi - lo, 1, w)[..., None]
+
+    c1 = np.cumsum(seg, axis=-1)
+    c2 = np.cumsum(seg * seg, axis=-1)
+    k = np.arange(1, w + 1)                       # 前半のサンプル数
+    tot1, tot2 = np.take_along_axis(c1, m - 1, -1), np.take_along_axis(c2, m - 1, -1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var1 = c2 / k - (c1 / k) ** 2
+        nb = m - k
+        var2 = (tot2 - c2) / nb - ((tot1 - c1) / nb) ** 2
+        aic = k * np.log(var1) + (nb - 1) * np.log(var2)
+    # 立ち上がり（後半の分散が大きい）だけを候補にする（コーダが減衰してノイズに戻る点は除く）
+    usable = (k >= 2) & (nb >= 2) & valid & np.isfinite(aic) & (var2 > var1)
+    aic = np.where(usable, aic, np.inf)
+    onset = lo + aic.argmin(axis=-1) + 1
+    return np.where((lo >= 0) & usable.any(axis=-1), onset, -1)
+
+# ===== P / S の読み取り（サンプル番号） =====
+def pick_array(x, sr):
+    """x (..., n) の各トレースの (P, S) のサンプル番号（見つからなければ -1）
+
+    P: STA/LTA が P_ON を超えた点の前後で AIC 最小、S: P の MIN_SP_S〜MAX_SP_S 秒後で AIC 最小。
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[-1]
+    ratio = sta_lta(x, sr)
+    before, after = int(AIC_BEFORE_S * sr), int(AIC_AFTER_S * sr)
+
+    p_trig = first_trigger(ratio, P_ON)
+    p = aic_onset(x, np.where(p_trig >= 0, np.maximum(p_trig - before, 0), -1),
+                  np.minimum(p_trig + after, n))
+
+    # S は P の後の窓で AIC（P のコーダで STA/LTA が下がりきらないため、トリガは使わない）
+    s_lo = np.where(p >= 0, np.minimum(p + int(MIN_SP_S * sr), n), -1)
+    s = aic_onset(x, s_lo, np.minimum(p + int(MAX_SP_S * sr), n))
+    return p, s
+
+def pick_batch(traces, sr):
+    """同じ長さの (イベント数, 成分数, n) 配列 → (P, S) のサンプル番号 (イベント数, 成分数)"""
+    return pick_array(traces, sr)
+
+# ===== 1観測点の3成分 → click_table と同じ形の候補 =====
+def pick_traces(waveform_data, sr, start=0.0):
+    """{成分: 波形 または None} → {"left": {成分: 時刻}, "right": {成分: 時刻}}（時刻は start 基準の秒、なければ None）"""
+    comps = [c for c, d in waveform_data.items() if d is not None]
+    out = {"left": {c: None for c in waveform_data}, "right": {c: None for c in waveform_data}}
+    if not comps:
+        return out
+    n = min(len(waveform_data[c]) for c in comps)
+    p, s = pick_array(np.stack([np.asarray(waveform_data[c][:n], dtype=float) for c in comps]), sr)
+    for c, pi, si in zip(comps, p, s):
+        out["left"][c] = round(start + pi / sr, 3) if pi >= 0 else None
+        out["right"][c] = round(start + si / sr, 3) if si >= 0 else None
+    return out
+
+# ===== ベンチマーク（合成波形で イベント/秒 と 読み取り誤差） =====
+def synthetic_events(n_events, sr=100, duration_s=210, seed=0):
+    """ノイズ + P / S の立ち上がりを持つ3成分波形 → (波形 (n_events, 3, n), P 番号, S 番号)"""
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * sr)
+    x = rng.standard_normal((n_events, 3, n))
+    t = np.arange(n)
+    p = rng.integers(int(40 * sr), int(80 * sr), n_events)
+    s = p + rng.integers(int(3 * sr), int(20 * sr), n_events)
+    for amp, onset, f in [((8, 4, 4), p, 6.0), ((6, 16, 16), s, 3.0)]:
+        dt = (t[None, :] - onset[:, None]) / sr
+        env = np.where(dt >= 0, np.exp(-np.clip(dt, 0, None) / 8.0), 0.0)
+        wave = env * np.sin(2 * np.pi * f * np.clip(dt, 0, None))
+        x += np.asarray(amp)[None, :, None] * wave[:, None, :]
+    return x, p, s
+
+def benchmark(n_events=200, sr=100, duration_s=210, chunk=32):
+    x, p_true, s_true = synthetic_events(n_events, sr, duration_s)
+    t0 = time.perf_counter()
+    p = np.empty((n_events, 3), dtype=int)
+    s = np.empty((n_events, 3), dtype=int)
+    for i in range(0, n_events, chunk):
+        p[i:i + chunk], s[i:i + chunk] = pick_batch(x[i:i + chunk], sr)
+    elapsed = time.perf_counter() - t0
+    p_err = np.abs(p - p_true[:, None]) / sr
+    s_err = np.abs(s[:, 1:] - s_true[:, None]) / sr
+    print(f"{n_events} events x 3 comps x {duration_s} s @ {sr} Hz")
+    print(f"time      : {elapsed:.2f} s  ({n_events / elapsed:.0f} events/s)")
+    print(f"P (all)   : median |err| {np.median(p_err):.3f} s, within 0.1 s {np.mean(p_err <= 0.1):.0%}")
+    print(f"S (n, e)  : median |err| {np.median(s_err):.3f} s, within 0.2 s {np.mean(s_err <= 0.2):.0%}")
+
+if __name__ == "__main__":
+    benchmark()
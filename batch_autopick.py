@@ -0,0 +1,133 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from waveform_cache import load_event, select_events, window_around
+from autopick import pick_traces
+
+# ===== 設定（Arrival-time-record.py と同じ選び方） =====
+CSV_PATH = "/workspaces/固体地球物理学講座/earthquake_data/earthquake_info@sakurajima/earthquake_info@sakurajima_add.csv"
+BASE_DIR = "/workspaces/固体地球物理学講座/earthquake_data/earthquake_info@sakurajima"
+START_DATE = "2025-06-01 00:00:00"
+END_DATE = "2025-07-31 23:59:59"
+ROW_RANGE = None          # 行番号で選ぶ場合 (開始, 終了)。指定すると日付範囲より優先
+STATIONS = ['v.skd2']
+COMPONENTS = ['u', 'n', 'e']
+
+SAVE_DIR = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check"
+WAVE_CACHE_DIR = os.path.join(SAVE_DIR, "wave_cache")
+WAVE_READER = "select"
+LOAD_WINDOW = (-30, 180)  # 発震時刻からの秒数 (前, 後)。None で記録全体
+
+# 出力（手で付けたピックと混ざらないよう別ディレクトリ。中身は Make_hist*.py がそのまま読める形）
+OUTPUT_DIR = os.path.join(SAVE_DIR, "autopick")
+SUMMARY_JSON = os.path.join(OUTPUT_DIR, "click_table_summary.json")
+CLICKED_JSON = os.path.join(OUTPUT_DIR, "clicked_times.json")
+# 終わったイベントを1行ずつ追記する進捗ファイル（中断後はここから再開）
+PROGRESS_JSONL = os.path.join(OUTPUT_DIR, "autopick_progress.jsonl")
+N_WORKERS = os.cpu_count()
+WRITE_EVERY = 200         # この件数ごとに集計 JSON を書き直す
+
+# ===== 1イベント分の自動読み取り =====
+def pick_event(event):
+    """(event_id, {観測点: {"left": {成分: 時刻}, "right": {...}}}, エラー文字列 または None)"""
+    event_id = os.path.basename(event["datadir"])
+    keys = [f"{station}.{comp}" for station in STATIONS for comp in COMPONENTS]
+    try:
+        waves = load_event(event["datadir"], event["ch_filepath"], keys, cache_dir=WAVE_CACHE_DIR,
+                           reader=WAVE_READER, window=window_around(event["time"], LOAD_WINDOW))
+    except Exception as e:
+        return event_id, {}, f"{type(e).__name__}: {e}"
+    picks = {}
+    for station in STATIONS:
+        found = {comp: waves[f"{station}.{comp}"] for comp in COMPONENTS
+                 if waves[f"{station}.{comp}"] is not None}
+        if not found:
+            continue
+        # 時間軸はピッカーと同じ（最初に見つかった成分のサンプリングレート・開始秒）
+        _, sr, start = next(iter(found.values()))
+        waveform_data = {comp: (found[comp][0] if comp in found else None) for comp in COMPONENTS}
+        picks[station] = pick_traces(waveform_data, sr, start)
+    return event_id, picks, None
+
+# ===== 進捗ファイル =====
+def load_progress():
+    """{event_id: 観測点ごとの候補}（途中で切れた最終行は無視）"""
+    done = {}
+    if not os.path.exists(PROGRESS_JSONL):
+        return done
+    with open(PROGRESS_JSONL, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[rec["event_id"]] = rec["picks"]
+    return done
+
+def _dump_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def write_summaries(done, order):
+    """click_table_summary.json（値）と clicked_times.json（値のリスト）をイベント順に書く"""
+    table, clicked = {}, {}
+    for event_id in order:
+        if not done.get(event_id):
+            continue
+        table[event_id] = done[event_id]
+        clicked[event_id] = {
+            station: {side: {comp: ([] if t is None else [t]) for comp, t in comps.items()}
+                      for side, comps in sides.items()}
+            for station, sides in done[event_id].items()
+        }
+    _dump_json(SUMMARY_JSON, table)
+    _dump_json(CLICKED_JSON, clicked)
+
+# ===== メイン処理 =====
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    events = select_events(CSV_PATH, BASE_DIR, START_DATE, END_DATE, ROW_RANGE)
+    order = [os.path.basename(ev["datadir"]) for ev in events]
+    done = load_progress()
+    todo = [ev for ev, event_id in zip(events, order) if event_id not in done]
+    print(f"{len(events)} events ({len(events) - len(todo)} already picked, {len(todo)} to go)")
+
+    t0 = time.perf_counter()
+    n_err = 0
+    with open(PROGRESS_JSONL, "a", encoding="utf-8") as progress:
+        def on_done(n, result):
+            nonlocal n_err
+            event_id, picks, error = result
+            if error is not None:
+                # 読めなかったイベントは記録しない（次回また試す）
+                n_err += 1
+                print(f"[{n}/{len(todo)}] {event_id}: {error}")
+                return
+            done[event_id] = picks
+            progress.write(json.dumps({"event_id": event_id, "picks": picks}, ensure_ascii=False) + "\n")
+            progress.flush()
+            os.fsync(progress.fileno())
+            if n % WRITE_EVERY == 0:
+                write_summaries(done, order)
+            print(f"[{n}/{len(todo)}] {event_id}")
+
+        if N_WORKERS and N_WORKERS > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=min(N_WORKERS, len(todo))) as ex:
+                futures = [ex.submit(pick_event, ev) for ev in todo]
+                for n, fut in enumerate(as_completed(futures), 1):
+                    on_done(n, fut.result())
+        else:
+            for n, ev in enumerate(todo, 1):
+                on_done(n, pick_event(ev))
+
+    write_summaries(done, order)
+    elapsed = time.perf_counter() - t0
+    print(f"picked {len(todo) - n_err} events, {n_err} errors ({elapsed:.1f} s, "
+          f"{(len(todo) - n_err) / max(elapsed, 1e-9):.1f} events/s)")
+    print(f"Saved {SUMMARY_JSON} / {CLICKED_JSON}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from waveform_cache import load_event_status, select_events, window_around
+
+# ===== 設定（Arrival-time-record.py と同じ選び方） =====
+CSV_PATH = "/workspaces/固体地球物理学講座/earthquake_data/earthquake_info@sakurajima/earthquake_info@sakurajima_add.csv"
+BASE_DIR = "/workspaces/固体地球物理学講座/earthquake_data/earthquake_info@sakurajima"
+START_DATE = "2025-06-01 00:00:00"
+END_DATE = "2025-07-31 23:59:59"
+ROW_RANGE = None          # 行番号で選ぶ場合 (開始, 終了)（例: (4, 10)）。指定すると日付範囲より優先
+STATIONS = ['v.skd2']
+COMPONENTS = ['u', 'n', 'e']
+
+SAVE_DIR = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check"
+WAVE_CACHE_DIR = os.path.join(SAVE_DIR, "wave_cache")
+WAVE_READER = "select"
+LOAD_WINDOW = (-30, 180)  # 発震時刻からの秒数 (前, 後)。None で記録全体
+REPORT_CSV = os.path.join(SAVE_DIR, "decode_report.csv")
+N_WORKERS = os.cpu_count()
+
+# ===== 1イベント分のデコード（キャッシュへ書き込み）と報告行 =====
+def decode_event(event):
+    event_id = os.path.basename(event["datadir"])
+    keys = [f"{station}.{comp}" for station in STATIONS for comp in COMPONENTS]
+    t0 = time.perf_counter()
+    try:
+        waves, cached = load_event_status(event["datadir"], event["ch_filepath"], keys,
+                                          cache_dir=WAVE_CACHE_DIR, reader=WAVE_READER,
+                                          window=window_around(event["time"], LOAD_WINDOW))
+    except Exception as e:
+        return [{"event_id": event_id, "channel": key, "status": "error",
+                 "error": f"{type(e).__name__}: {e}"} for key in keys]
+    elapsed = time.perf_counter() - t0
+    rows = []
+    for key in keys:
+        row = {"event_id": event_id, "channel": key, "cached": cached, "decode_s": round(elapsed, 3)}
+        if waves[key] is None:
+            row["status"] = "missing"
+        else:
+            data, sr, start = waves[key]
+            row.update(status="found", sampling_rate=sr, n_samples=len(data),
+                       duration_s=len(data) / sr, start_s=start)
+        rows.append(row)
+    return rows
+
+# ===== メイン処理 =====
+def main():
+    events = select_events(CSV_PATH, BASE_DIR, START_DATE, END_DATE, ROW_RANGE)
+    print(f"{len(events)} events")
+    cols = ["event_id", "channel", "status", "sampling_rate", "n_samples", "duration_s",
+            "start_s", "cached", "decode_s", "error"]
+    results = {}
+    t0 = time.perf_counter()
+    if N_WORKERS and N_WORKERS > 1 and len(events) > 1:
+        with ProcessPoolExecutor(max_workers=min(N_WORKERS, len(events))) as ex:
+            futures = {ex.submit(decode_event, ev): i for i, ev in enumerate(events)}
+            for n, fut in enumerate(as_completed(futures), 1):
+                results[futures[fut]] = fut.result()
+                print(f"[{n}/{len(events)}] {results[futures[fut]][0]['event_id']}")
+    else:
+        for i, ev in enumerate(events):
+            results[i] = decode_event(ev)
+            print(f"[{i + 1}/{len(events)}] {results[i][0]['event_id']}")
+
+    # 報告はイベント順
+    report = pd.DataFrame([row for i in sorted(results) for row in results[i]], columns=cols)
+    report = report.astype({"sampling_rate": "Int64", "n_samples": "Int64"})
+    os.makedirs(os.path.dirname(REPORT_CSV), exist_ok=True)
+    report.to_csv(REPORT_CSV, index=False, encoding="utf-8-sig")
+    counts = report["status"].value_counts()
+    print(f"found {counts.get('found', 0)}, missing {counts.get('missing', 0)}, "
+          f"error {counts.get('error', 0)} channels ({time.perf_counter() - t0:.1f} s)")
+    print(f"Saved {REPORT_CSV}")
+
+if __name__ == "__main__":
+    main()
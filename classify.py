@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# ===== 分類表 =====
+# edges: 小さい方から (比較, 境界)。">=" なら境界値は上のクラス、">" なら下のクラスに入る
+# labels: クラス名（len(edges) + 1 個、同じ名前が複数回出てもよい）
+# period: 指定すると値をその周期で折り返してから分類する（方位角など）
+
+# 8方位（観測点から見た方位角 0-360°）
+AZIMUTH_8 = {
+    "edges": [(">=", 22.5), (">=", 67.5), (">=", 112.5), (">=", 157.5),
+              (">=", 202.5), (">=", 247.5), (">=", 292.5), (">=", 337.5)],
+    "labels": ["N", "NE", "E", "SE", "S", "SW", "W", "NW", "N"],
+    "period": 360.0,
+}
+
+# 仰角クラス（station_event_classification: 30° ちょうどは Middle）
+DIP_CLASSES = {
+    "edges": [(">=", 30), (">", 45)],
+    "labels": ["Beside", "Middle", "Beneath"],
+}
+
+# 仰角クラス（quadrant_filter_with_angle: 30° ちょうどは Beside）
+ELEVATION_CLASSES = {
+    "edges": [(">", 30), (">", 45)],
+    "labels": ["Beside(≤30°)", "Medium(30°-45°)", "Beneath(>45°)"],
+}
+
+# 深さ帯 [km]
+DEPTH_BANDS = {
+    "edges": [(">=", 50), (">=", 100)],
+    "labels": ["0-50km", "50-100km", "100-km"],
+}
+
+# ===== 表による一括分類 =====
+def classify(values, table, labels=None):
+    """1次元の値をまとめて分類し、pandas の Categorical を返す（欠損値は欠損のまま）
+
+    labels を渡すと table のクラス名を置き換える（境界は table のものを使う）。
+    """
+    x = np.asarray(values, dtype=float)
+    if "period" in table:
+        x = x % table["period"]
+    labels = table["labels"] if labels is None else labels
+    # 各値が越えた境界の数 = クラス番号
+    idx = np.zeros(x.shape, dtype=np.intp)
+    for op, edge in table["edges"]:
+        idx += (x > edge) if op == ">" else (x >= edge)
+    categories = list(dict.fromkeys(labels))
+    codes = np.array([categories.index(l) for l in labels])[idx]
+    codes = np.where(np.isnan(x), -1, codes)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+# ===== 方位分類 (北/東/南/西)：緯度差と経度差の大きい方 =====
+def classify_direction(lat, lon, base_lat, base_lon):
+    """カテゴリはアルファベット順（文字列で並べ替えていた従来の出力順と同じ）"""
+    dlat = np.asarray(lat, dtype=float) - base_lat
+    dlon = np.asarray(lon, dtype=float) - base_lon
+    direction = np.where(np.abs(dlat) >= np.abs(dlon),
+                         np.where(dlat > 0, "North", "South"),
+                         np.where(dlon > 0, "East", "West"))
+    return pd.Categorical(direction, categories=["East", "North", "South", "West"])
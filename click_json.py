@@ -0,0 +1,151 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# ===== click_table_summary.json を1イベントずつ読む =====
+# {event_id: {観測点: {"left": {成分: 時刻}, "right": {...}}}, ...} の最上位だけを自前でたどり、
+# イベント1つ分の値だけを json で decode する。全体を dict の木として持たない。
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+
+def iter_events(path, chunk_size=1 << 20):
+    """(event_id, {観測点: {"left": {...}, "right": {...}}}) をファイルの並び順に返す"""
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos = "", 0
+
+        def fill():
+            nonlocal buf, pos
+            chunk = f.read(chunk_size)
+            buf, pos = buf[pos:] + chunk, 0
+            return bool(chunk)
+
+        def next_char():
+            """空白を飛ばした次の文字（ファイル末尾なら ""）"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ""
+
+        def value():
+            nonlocal pos
+            while True:
+                try:
+                    obj, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # チャンクの境目で切れている → 読み足して最初から decode し直す
+                    if fill():
+                        continue
+                    raise
+                if end == len(buf) and fill():
+                    continue
+                pos = end
+                return obj
+
+        def expect(chars):
+            nonlocal pos
+            c = next_char()
+            if c not in chars:
+                raise json.JSONDecodeError(f"Expecting {' or '.join(repr(x) for x in chars)}", buf, pos)
+            pos += 1
+            return c
+
+        expect("{")
+        if next_char() == "}":
+            return
+        while True:
+            next_char()
+            event = value()
+            expect(":")
+            next_char()
+            yield event, value()
+            if expect(",}") == "}":
+                return
+
+# ===== 平らな列（観測点×イベント 1行）に直接詰める =====
+def read_columns(path, components=("u", "n", "e"), capacity=None):
+    """{"Event": Categorical, "Station": Categorical, "left_u": float64 配列, …, "right_e": …}
+
+    行の並びは JSON と同じ（イベント順、その中で観測点順）。値が null / ない成分は NaN。
+    列の配列はファイルサイズから見積もった行数で先に確保し、足りなければ倍に広げ、最後に切り詰める。
+    """
+    names = [f"{side}_{c}" for side in ("left", "right") for c in components]
+    if capacity is None:
+        # indent=2 の1行（観測点1つ分）はおよそ 200 バイト
+        capacity = max(os.path.getsize(path) // 150, 16)
+    ev_code = np.empty(capacity, dtype=np.int32)
+    st_code = np.empty(capacity, dtype=np.int32)
+    times = [np.empty(capacity) for _ in names]
+    events, stations = [], {}
+    n = 0
+    for event, ev in iter_events(path):
+        events.append(event)
+        for station, sd in ev.items():
+            if n == capacity:
+                capacity *= 2
+                for arr in [ev_code, st_code] + times:
+                    arr.resize(capacity, refcheck=False)
+            ev_code[n] = len(events) - 1
+            st_code[n] = stations.setdefault(station, len(stations))
+            j = 0
+            for side in ("left", "right"):
+                comps = sd.get(side) or {}
+                for c in components:
+                    t = comps.get(c)
+                    times[j][n] = np.nan if t is None else t
+                    j += 1
+            n += 1
+    for arr in [ev_code, st_code] + times:
+        arr.resize(n, refcheck=False)
+    out = {"Event": pd.Categorical.from_codes(ev_code, events),
+           "Station": pd.Categorical.from_codes(st_code, list(stations))}
+    out.update(zip(names, times))
+    return out
+
+# ===== ベンチマーク（json.load と比べたピークメモリ） =====
+def benchmark_memory(n_events=100_000, stations=6, out_path=None):
+    """python -c "import click_json; click_json.benchmark_memory()" """
+    import tempfile
+    import time
+    import tracemalloc
+    out_path = out_path or os.path.join(tempfile.mkdtemp(), "click_table_summary.json")
+    rng = np.random.default_rng(0)
+    st_names = [f"v.st{k:02d}" for k in range(stations)]
+    with open(out_path, "w", encoding="utf-8") as f:
+        data = {}
+        for i in range(n_events):
+            data[f"2025{i:08d}_SAKURAJIMA"] = {
+                st: {side: {c: (None if rng.random() < 0.1 else round(float(rng.uniform(0, 300)), 3))
+                            for c in ("u", "n", "e")} for side in ("left", "right")}
+                for st in st_names}
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        del data
+
+    def measure(load):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = load()
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    def with_json_load():
+        with open(out_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    _, t_json, m_json = measure(with_json_load)
+    cols, t_cols, m_cols = measure(lambda: read_columns(out_path))
+    out_bytes = sum(np.asarray(v).nbytes if not isinstance(v, pd.Categorical) else v.codes.nbytes
+                    for v in cols.values())
+    print(f"{os.path.getsize(out_path) / 1e6:.1f} MB JSON, {len(cols['Event']):,} rows")
+    print(f"json.load    : {t_json:6.2f} s, peak {m_json / 1e6:8.1f} MB")
+    print(f"read_columns : {t_cols:6.2f} s, peak {m_cols / 1e6:8.1f} MB (output arrays {out_bytes / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    benchmark_memory()
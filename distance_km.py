@@ -1,6 +1,6 @@
-import math
 import pandas as pd
 from io import StringIO
+from geodesy import haversine_km
 
 # 桜島の緯度経度
 SAKURAJIMA_LAT = 31.593
@@ -32,20 +32,8 @@ data = """time,latitude,longitude,depth_km,magnitude,distance_km,elevation_angle
 
 df = pd.read_csv(StringIO(data))
 
-# Haversine 公式で距離を計算する関数（km単位）
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0  # 地球半径 [km]
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
-
-# 各地震の震央距離を計算して新しい列に追加
-df['distance_km'] = df.apply(
-    lambda row: haversine(SAKURAJIMA_LAT, SAKURAJIMA_LON, row['latitude'], row['longitude']),
-    axis=1
-)
+# 各地震の震央距離を Haversine 公式でまとめて計算して新しい列に追加（km単位）
+df['distance_km'] = haversine_km(SAKURAJIMA_LAT, SAKURAJIMA_LON, df['latitude'], df['longitude'])
 
 # 結果を表示
 print(df[['time', 'latitude', 'longitude', 'magnitude', 'place', 'distance_km']])
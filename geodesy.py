@@ -0,0 +1,86 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+
+# ===== haversine距離計算(km)（配列・列をまとめて） =====
+def haversine_km(lat1, lon1, lat2, lon2):
+    φ1, φ2 = np.radians(lat1), np.radians(lat2)
+    dφ     = np.radians(np.subtract(lat2, lat1))
+    dλ     = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dφ/2)**2 + np.cos(φ1)*np.cos(φ2)*np.sin(dλ/2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+# ===== 方位角(0-360度)：点1から見た点2の向き =====
+def azimuth_deg(lat1, lon1, lat2, lon2):
+    φ1, φ2 = np.radians(lat1), np.radians(lat2)
+    dλ = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(dλ) * np.cos(φ2)
+    x = np.cos(φ1)*np.sin(φ2) - np.sin(φ1)*np.cos(φ2)*np.cos(dλ)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+# ===== 仰角(度)：深さと水平距離から =====
+def elevation_angle_deg(depth_km, horizontal_km):
+    """水平距離と深さから仰角(度)を計算
+
+    水平距離が 0 か欠損なら 90°、深さが欠損なら 0°（quadrant_filter_with_angle の従来の扱い）。
+    """
+    depth = np.asarray(depth_km, dtype=float)
+    horiz = np.asarray(horizontal_km, dtype=float)
+    with np.errstate(invalid="ignore"):
+        angle = np.degrees(np.arctan2(depth, horiz))
+    angle = np.where(np.isnan(depth), 0.0, angle)
+    return np.where((horiz == 0) | np.isnan(horiz), 90.0, angle)
+
+# ===== ベンチマーク（行ごとの df.apply vs 配列計算） =====
+def benchmark(n_rows=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"latitude": rng.uniform(24, 46, n_rows),
+                       "longitude": rng.uniform(122, 150, n_rows),
+                       "depth_km": np.where(rng.random(n_rows) < 0.01, np.nan,
+                                            rng.uniform(0, 300, n_rows))})
+    lat0, lon0 = 31.593, 130.657
+
+    def scalar_haversine(lat1, lon1, lat2, lon2):
+        φ1, φ2 = math.radians(lat1), math.radians(lat2)
+        dφ     = math.radians(lat2 - lat1)
+        dλ     = math.radians(lon2 - lon1)
+        a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def scalar_azimuth(lat1, lon1, lat2, lon2):
+        dlon = math.radians(lon2 - lon1)
+        y = math.sin(dlon) * math.cos(math.radians(lat2))
+        x = (math.cos(math.radians(lat1))*math.sin(math.radians(lat2))
+             - math.sin(math.radians(lat1))*math.cos(math.radians(lat2))*math.cos(dlon))
+        return (math.degrees(math.atan2(y, x)) + 360) % 360
+
+    def scalar_elevation(depth_km, horizontal_km):
+        if horizontal_km == 0 or pd.isna(horizontal_km):
+            return 90.0
+        if pd.isna(depth_km):
+            return 0.0
+        return math.degrees(math.atan2(depth_km, horizontal_km))
+
+    t0 = time.perf_counter()
+    d_ref = df.apply(lambda r: scalar_haversine(lat0, lon0, r.latitude, r.longitude), axis=1)
+    az_ref = df.apply(lambda r: scalar_azimuth(lat0, lon0, r.latitude, r.longitude), axis=1)
+    el_ref = pd.Series([scalar_elevation(d, h) for d, h in zip(df["depth_km"], d_ref)])
+    t_row = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    d = haversine_km(lat0, lon0, df["latitude"].to_numpy(), df["longitude"].to_numpy())
+    az = azimuth_deg(lat0, lon0, df["latitude"].to_numpy(), df["longitude"].to_numpy())
+    el = elevation_angle_deg(df["depth_km"].to_numpy(), d)
+    t_vec = time.perf_counter() - t0
+
+    err = max(np.max(np.abs(d - d_ref)), np.max(np.abs(az - az_ref)), np.max(np.abs(el - el_ref)))
+    print(f"{n_rows:,} rows (distance + azimuth + elevation)")
+    print(f"row-wise apply : {t_row:.3f} s")
+    print(f"vectorized     : {t_vec:.3f} s")
+    print(f"speedup        : x{t_row / t_vec:.0f}  (max abs diff {err:.2e})")
+
+if __name__ == "__main__":
+    benchmark()
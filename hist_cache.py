@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# ===== 出力（PNG / CSV）を書き直すかどうか =====
+# 出力ファイルごとに「何から作ったか」のキーを manifest (JSON) に覚えておき、
+# キーが前回と同じでファイルも残っていれば書き直さない。
+# 描き方（タイトル・軸の範囲など）をスクリプト側で変えたときは manifest を消せば全部描き直す。
+
+def content_key(df, cols, *extra, ordered=False):
+    """df[cols] の中身と extra から作るキー（ordered=False なら行の並びによらない）"""
+    h = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    if not ordered:
+        h = np.sort(h)
+    m = hashlib.blake2b(h.tobytes(), digest_size=16)
+    m.update(repr((list(cols),) + extra).encode())
+    return m.hexdigest()
+
+class OutputCache:
+    def __init__(self, manifest_path):
+        self.path = manifest_path
+        self.keys = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                try:
+                    self.keys = json.load(f)
+                except json.JSONDecodeError:
+                    self.keys = {}
+
+    def is_current(self, out_path, key):
+        return os.path.exists(out_path) and self.keys.get(os.path.abspath(out_path)) == key
+
+    def mark(self, out_path, key):
+        self.keys[os.path.abspath(out_path)] = key
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.keys, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,92 @@
+import json
+import os
+
+# ===== 追記専用のピック記録（1クリック = 1行） =====
+# {"event_id": ..., "station": ..., "side": "left"/"right", "comp": ..., "time": 秒}
+# 追記のたびに fsync するので、カーネルが落ちてもそれまでのピックは残る。
+# まとめ直し (compact) で click_table_summary.json / clicked_times.json に反映して空にする。
+
+def read_journal(path):
+    """記録を順に返す（書きかけで切れた最終行は無視）"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+class PickJournal:
+    def __init__(self, path):
+        self.path = path
+        self.n_pending = sum(1 for _ in read_journal(path))
+        self._f = open(path, "a", encoding="utf-8")
+        # 書きかけで切れた行があれば閉じておく（次の記録がその行に繋がらないように）
+        if self._f.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._f.write("\n")
+
+    def append(self, event_id, station, side, comp, value):
+        rec = {"event_id": event_id, "station": station, "side": side, "comp": comp, "time": value}
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self.n_pending += 1
+
+    def truncate(self):
+        self._f.truncate(0)
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self.n_pending = 0
+
+    def close(self):
+        self._f.close()
+
+# ===== 記録の反映 =====
+def apply_record(table, clicked, rec, components):
+    """table（click_table_summary の形）と clicked（clicked_times の形）に1件反映する"""
+    ev, st, side, comp = rec["event_id"], rec["station"], rec["side"], rec["comp"]
+    sides = table.setdefault(ev, {}).setdefault(st, {"left": {c: None for c in components},
+                                                     "right": {c: None for c in components}})
+    sides[side][comp] = rec["time"]
+    lists = clicked.setdefault(ev, {}).setdefault(st, {"left": {c: [] for c in components},
+                                                       "right": {c: [] for c in components}})
+    lists[side][comp] = [rec["time"]]
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+def _dump_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def compact(journal, summary_path, clicked_path, components):
+    """未反映の記録を集計ファイルに書き込み、記録を空にする → 反映した件数
+
+    集計ファイルを置き換えてから記録を空にするので、途中で止まっても次回の compact で
+    同じ記録がもう一度反映されるだけ（同じ値の上書きなので結果は変わらない）。
+    """
+    records = list(read_journal(journal.path))
+    if not records:
+        return 0
+    table = _load_json(summary_path)
+    clicked = _load_json(clicked_path)
+    for rec in records:
+        apply_record(table, clicked, rec, components)
+    _dump_json(summary_path, table)
+    _dump_json(clicked_path, clicked)
+    journal.truncate()
+    return len(records)
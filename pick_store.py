@@ -0,0 +1,438 @@
+import hashlib
+import json
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from click_json import read_columns
+
+# ===== 設定（python pick_store.py で JSON / 分類CSV を取り込む） =====
+JSON_PATH = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check/click_table_summary.json"
+CLASS_CSV = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/classify/station_event_classification.csv"
+STORE_PATH = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/Wave_Check/picks.sqlite"
+
+COMPONENTS = ["u", "n", "e"]
+SIDES = ["left", "right"]
+
+# ===== スキーマ =====
+# picks: click_table_summary.json の1値 = 1行（値が null の成分も行として持つ）。
+#        主キー (event, station, side, comp) がそのまま索引になる。rowid は JSON での並び順。
+# events: JSON でのイベントの並び (seq) と中身のハッシュ。ハッシュが変わったイベントの行だけ書き換える
+# classification: station_event_classification.csv の1行（同じ観測点×イベントは最初の行だけ）と行のハッシュ
+# sources: 取り込んだファイルの (パス, サイズ, 更新時刻)。変わっていなければ取り込み直さない
+# PRAGMA user_version: 書き込みのたびに 1 増やす世代番号（列指向の書き出しを作り直すかの判定に使う）
+# changes: 世代ごとに変わった (event, station)。station が NULL ならそのイベントの全観測点
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS picks (
+    event   TEXT NOT NULL,
+    station TEXT NOT NULL,
+    side    TEXT NOT NULL,
+    comp    TEXT NOT NULL,
+    time    REAL,
+    PRIMARY KEY (event, station, side, comp)
+);
+CREATE TABLE IF NOT EXISTS events (
+    event TEXT PRIMARY KEY,
+    seq   INTEGER NOT NULL,
+    hash  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classification (
+    station       TEXT NOT NULL,
+    event         TEXT NOT NULL,
+    azimuth_deg   REAL,
+    azimuth_class TEXT,
+    distance_km   REAL,
+    depth_km      REAL,
+    dip_angle_deg REAL,
+    dip_class     TEXT,
+    hash          INTEGER,
+    PRIMARY KEY (station, event)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    key  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    generation INTEGER NOT NULL,
+    event      TEXT NOT NULL,
+    station    TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_generation ON changes (generation);
+"""
+
+# 分類CSVの列名の揺れ（各 Make_hist*.py のリネームと同じ）
+CLASS_COLUMNS = {
+    "station":       ["station_name", "Station"],
+    "event":         ["place", "Event"],
+    "azimuth_deg":   ["azimuth_deg", "azimuth", "Azimuth"],
+    "azimuth_class": ["azimuth_class", "AzimuthClass"],
+    "distance_km":   ["distance_km"],
+    "depth_km":      ["depth_km", "depth", "Depth"],
+    "dip_angle_deg": ["dip_angle_deg", "dip", "Dip"],
+    "dip_class":     ["dip_class", "DipClass"],
+}
+
+def open_store(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    # ハッシュを持たない古いストアは、次の sync ですべて取り込み直す
+    if "hash" not in [r[1] for r in conn.execute("PRAGMA table_info(classification)")]:
+        with conn:
+            conn.execute("ALTER TABLE classification ADD COLUMN hash INTEGER")
+            conn.execute("DELETE FROM sources")
+    return conn
+
+# ===== 取り込み済みかどうか =====
+def _file_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+def _is_current(conn, name, path):
+    row = conn.execute("SELECT key FROM sources WHERE name = ?", (name,)).fetchone()
+    return row is not None and row[0] == _file_key(path)
+
+def _mark_current(conn, name, path):
+    conn.execute("INSERT OR REPLACE INTO sources (name, key) VALUES (?, ?)", (name, _file_key(path)))
+
+def store_generation(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _bump_generation(conn):
+    generation = store_generation(conn) + 1
+    conn.execute(f"PRAGMA user_version = {generation}")
+    return generation
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+# ===== click_table_summary.json ⇔ picks =====
+def _pick_rows(click_data):
+    for event, ev in click_data.items():
+        for station, sd in ev.items():
+            for side in SIDES:
+                for comp, t in sd.get(side, {}).items():
+                    yield event, station, side, comp, t
+
+def _column_rows(cols, rows):
+    """read_columns の列の rows 行目 → picks の行（JSON と同じ並び）"""
+    events, stations = cols["Event"], cols["Station"]
+    ev_names, st_names = list(events.categories), list(stations.categories)
+    for i in rows:
+        event, station = ev_names[events.codes[i]], st_names[stations.codes[i]]
+        for side in SIDES:
+            for comp in COMPONENTS:
+                t = cols[f"{side}_{comp}"][i]
+                yield event, station, side, comp, (None if np.isnan(t) else float(t))
+
+def import_click_json(conn, json_path):
+    """picks を JSON の中身に合わせる → 書き換えたイベントの数
+
+    JSON は1イベントずつ読んで列に詰める（全体を dict の木にしない）。
+    イベントごとの中身のハッシュを前回と比べ、変わった・増えた・消えたイベントの行だけを書き換える。
+    """
+    cols = read_columns(json_path, COMPONENTS)
+    events = list(cols["Event"].categories)
+    codes = cols["Event"].codes
+    row_hash = pd.util.hash_pandas_object(
+        pd.DataFrame({k: v for k, v in cols.items() if k != "Event"}), index=False).to_numpy()
+    # 行はイベント順に並んでいるので、イベント e の行は bounds[e]:bounds[e + 1]
+    bounds = np.searchsorted(codes, np.arange(len(events) + 1))
+    new_hash = {event: _hash64(row_hash[bounds[e]:bounds[e + 1]].tobytes()) for e, event in enumerate(events)}
+
+    old = {event: (seq, h) for event, seq, h in conn.execute("SELECT event, seq, hash FROM events")}
+    changed = [e for e in events if e not in old or old[e][1] != new_hash[e]]
+    removed = [e for e in old if e not in new_hash]
+    kept_old = [e for e in sorted(old, key=lambda e: old[e][0]) if e in new_hash]
+    reordered = kept_old != [e for e in events if e in old]
+    with conn:
+        if not old:
+            # イベントの記録がない（初回・古いストア）→ 全部入れ直す
+            conn.execute("DELETE FROM picks")
+        conn.executemany("DELETE FROM picks WHERE event = ?", [(e,) for e in changed + removed])
+        changed_set = set(changed)
+        rows = np.flatnonzero(np.isin(codes, [e for e, event in enumerate(events) if event in changed_set]))
+        conn.executemany("INSERT OR REPLACE INTO picks VALUES (?, ?, ?, ?, ?)", _column_rows(cols, rows))
+        conn.execute("DELETE FROM events")
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                         [(e, seq, new_hash[e]) for seq, e in enumerate(events)])
+        _mark_current(conn, "picks", json_path)
+        if changed or removed or reordered:
+            generation = _bump_generation(conn)
+            conn.executemany("INSERT INTO changes VALUES (?, ?, NULL)",
+                             [(generation, e) for e in changed + removed])
+    return len(changed) + len(removed)
+
+def set_picks(conn, event, station, sides):
+    """1観測点分 {"left": {成分: 時刻}, "right": {...}} を書き込む（既存の値は上書き）"""
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO picks VALUES (?, ?, ?, ?, ?)",
+                         _pick_rows({event: {station: sides}}))
+        # JSON とは中身が食い違うので、ハッシュは次の取り込みで必ず書き直される値にしておく
+        conn.execute("""INSERT INTO events VALUES (?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM events), 0)
+                        ON CONFLICT (event) DO UPDATE SET hash = 0""", (event,))
+        generation = _bump_generation(conn)
+        conn.execute("INSERT INTO changes VALUES (?, ?, NULL)", (generation, event))
+
+def export_click_json(conn, json_path):
+    """picks を click_table_summary.json と同じ形で書き出す（並びは取り込んだときの順）
+
+    ピックのない（観測点が空の）イベントも events の行から {} として書き出す。
+    """
+    click_data = {event: {} for (event,) in conn.execute("SELECT event FROM events ORDER BY seq")}
+    for event, station, side, comp, t in conn.execute(
+            "SELECT p.event, p.station, p.side, p.comp, p.time FROM picks p "
+            "LEFT JOIN events e ON e.event = p.event ORDER BY e.seq, p.rowid"):
+        sides = click_data.setdefault(event, {}).setdefault(station, {s: {} for s in SIDES})
+        sides[side][comp] = t
+    tmp = json_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(click_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, json_path)
+    return click_data
+
+# ===== station_event_classification.csv → classification =====
+def import_classification_csv(conn, csv_path, chunksize=500_000):
+    """分類CSVで classification を置き換える → ピックのある行のうち変わった行の数
+
+    行ごとのハッシュを前回と比べ、変わった・増えた・消えた (観測点, イベント) のうち
+    ピックのあるものだけを changes に残す（差分表のその行だけを作り直せばよい）。
+    """
+    header = pd.read_csv(csv_path, nrows=0, encoding="utf-8-sig").columns
+    usecols = {}
+    for col, names in CLASS_COLUMNS.items():
+        found = [n for n in names if n in header]
+        if found:
+            usecols[found[0]] = col
+    for col in ("station", "event"):
+        if col not in usecols.values():
+            raise KeyError(f"分類CSVに{' / '.join(repr(n) for n in CLASS_COLUMNS[col])}がありません")
+    cols = list(CLASS_COLUMNS)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.classification_new")
+        conn.execute("CREATE TEMP TABLE classification_new AS SELECT * FROM classification WHERE 0")
+        conn.execute("CREATE UNIQUE INDEX temp.classification_new_key ON classification_new (station, event)")
+        for chunk in pd.read_csv(csv_path, usecols=list(usecols), encoding="utf-8-sig",
+                                 chunksize=chunksize):
+            chunk = chunk.rename(columns=usecols).reindex(columns=cols)
+            chunk["hash"] = pd.util.hash_pandas_object(chunk, index=False).to_numpy().view(np.int64)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            # 同じ観測点×イベントは最初の行を残す（drop_duplicates(keep="first") と同じ）
+            conn.executemany(f"INSERT OR IGNORE INTO classification_new VALUES ({', '.join('?' * (len(cols) + 1))})",
+                             chunk.itertuples(index=False, name=None))
+        changed = conn.execute("""
+            SELECT station, event FROM (
+                SELECT n.station, n.event FROM classification_new n
+                LEFT JOIN classification o ON o.station = n.station AND o.event = n.event
+                WHERE o.hash IS NOT n.hash
+                UNION
+                SELECT o.station, o.event FROM classification o
+                LEFT JOIN classification_new n ON n.station = o.station AND n.event = o.event
+                WHERE n.station IS NULL
+            ) k
+            WHERE EXISTS (SELECT 1 FROM picks p WHERE p.event = k.event AND p.station = k.station)
+        """).fetchall()
+        conn.execute("DELETE FROM classification")
+        conn.execute("INSERT INTO classification SELECT * FROM classification_new")
+        conn.execute("DROP TABLE temp.classification_new")
+        _mark_current(conn, "classification", csv_path)
+        if changed:
+            generation = _bump_generation(conn)
+            conn.executemany("INSERT INTO changes VALUES (?, ?, ?)",
+                             [(generation, event, station) for station, event in changed])
+    return len(changed)
+
+def sync(conn, json_path=None, class_csv=None):
+    """ファイルが前回の取り込みから変わっていれば取り込み直す"""
+    if json_path is not None and not _is_current(conn, "picks", json_path):
+        n = import_click_json(conn, json_path)
+        print(f"📥 {json_path} を取り込みました（変わったイベント {n}）")
+    if class_csv is not None and not _is_current(conn, "classification", class_csv):
+        n = import_classification_csv(conn, class_csv)
+        print(f"📥 {class_csv} を取り込みました（ピックのある行で変わったもの {n}）")
+
+# ===== 差分表（観測点×イベント 1行、分類つき） =====
+DELTAS = [("left", "n"), ("left", "e"), ("right", "n"), ("right", "e")]
+CLASS_ATTRS = {"AzimuthClass": "azimuth_class", "DipClass": "dip_class", "Depth": "depth_km",
+               "Azimuth": "azimuth_deg", "Distance": "distance_km", "Dip": "dip_angle_deg"}
+
+def delta_table(conn, stations=None, raw=False, classes=("AzimuthClass", "DipClass", "Depth"),
+                events=None, **where):
+    """Station, Event, (left_u … right_e,) left_n-u, left_e-u, right_n-u, right_e-u, (分類列) の DataFrame
+
+    並びは click_table_summary.json と同じ（イベント順、その中で観測点順）。
+    stations / events で観測点・イベントを、where（例 AzimuthClass="N"）で分類の値を絞り込む。
+    """
+    def val(side, comp):
+        return f"MAX(CASE WHEN p.side = '{side}' AND p.comp = '{comp}' THEN p.time END)"
+    cols = ["p.station AS Station", "p.event AS Event"]
+    if raw:
+        cols += [f'{val(s, c)} AS "{s}_{c}"' for s in SIDES for c in COMPONENTS]
+    cols += [f'{val(s, c)} - {val(s, "u")} AS "{s}_{c}-u"' for s, c in DELTAS]
+    cols += [f'c.{CLASS_ATTRS[name]} AS "{name}"' for name in classes]
+
+    conds, params = [], []
+    if stations is not None:
+        conds.append(f"p.station IN ({', '.join('?' * len(stations))})")
+        params += list(stations)
+    if events is not None:
+        conds.append(f"p.event IN ({', '.join('?' * len(events))})")
+        params += list(events)
+    for name, value in where.items():
+        conds.append(f"c.{CLASS_ATTRS[name]} = ?")
+        params.append(value)
+    sql = f"""
+        SELECT {', '.join(cols)}
+        FROM picks p
+        LEFT JOIN classification c ON c.station = p.station AND c.event = p.event
+        LEFT JOIN events e ON e.event = p.event
+        {'WHERE ' + ' AND '.join(conds) if conds else ''}
+        GROUP BY p.event, p.station
+        ORDER BY e.seq, MIN(p.rowid)
+    """
+    df = pd.read_sql_query(sql, conn, params=params)
+    # 全部 NULL の列も float (NaN) にそろえる
+    num = [c for c in df.columns if c not in ("Station", "Event", "AzimuthClass", "DipClass")]
+    df[num] = df[num].astype(float)
+    return df
+
+# ===== 列指向の書き出し（Arrow IPC ファイル、メモリマップでそのまま読む） =====
+# 観測点×イベント 1行の差分表全体を、ストアの世代番号が変わったときだけ書き直す。
+# Station / Event / 分類クラスは辞書型（pandas では category）。
+# ピック時刻・差分・深さ・方位角は float64 のまま（JSON の値やビン境界ちょうどの値が動かないように）。
+# 欠損は null ではなく NaN で持つので、数値列はコピーなしで pandas に渡せる。
+# ARROW_FORMAT は列の型を変えたら増やす（古い形式のファイルは世代が同じでも作り直す）。
+TIME_COLS = [f"{s}_{c}" for s in SIDES for c in COMPONENTS]
+DELTA_COLS = [f"{s}_{c}-u" for s, c in DELTAS]
+ARROW_CLASSES = ("AzimuthClass", "DipClass", "Depth", "Azimuth")
+ARROW_FORMAT = "2"
+
+def write_arrow(df, path, generation=0):
+    import pyarrow as pa
+    columns = {}
+    for col in df.columns:
+        if col in ("Station", "Event", "AzimuthClass", "DipClass"):
+            columns[col] = pa.array(df[col].astype("category"))
+        else:
+            columns[col] = pa.array(df[col].to_numpy(dtype=np.float64))
+    table = pa.table(columns, metadata={"generation": str(generation), "format": ARROW_FORMAT})
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+def read_arrow(path):
+    import pyarrow as pa
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+# 変わったイベントがこれより多ければ、行の差し替えではなく表全体を作り直す
+MAX_PATCH_EVENTS = 5000
+
+def _updated_delta(conn, table, since):
+    """世代 since の表（列指向ファイルの中身）に、それ以降に変わった行だけ作り直して入れる → (表, 作り直した行数)"""
+    if table is None or since is None or since > store_generation(conn):
+        df = delta_table(conn, raw=True, classes=ARROW_CLASSES)
+        return df, len(df)
+    keys = conn.execute("SELECT DISTINCT event, station FROM changes WHERE generation > ?", (since,)).fetchall()
+    whole = {e for e, s in keys if s is None}
+    pairs = {(e, s) for e, s in keys if s is not None and e not in whole}
+    events = whole | {e for e, _ in pairs}
+    if len(events) > MAX_PATCH_EVENTS:
+        df = delta_table(conn, raw=True, classes=ARROW_CLASSES)
+        return df, len(df)
+
+    old = table.to_pandas()
+    old_key = pd.MultiIndex.from_arrays([old["Event"].astype(str), old["Station"].astype(str)])
+    hit = old["Event"].isin(whole).to_numpy() | old_key.isin(list(pairs))
+    parts, pos = [old[~hit]], [np.flatnonzero(~hit)]
+    n_fresh = 0
+    if events:
+        fresh = delta_table(conn, raw=True, classes=ARROW_CLASSES, events=sorted(events))
+        fresh_key = pd.MultiIndex.from_arrays([fresh["Event"], fresh["Station"]])
+        is_whole = fresh["Event"].isin(whole).to_numpy()
+        is_pair = ~is_whole & fresh_key.isin(list(pairs))
+        # 分類だけ変わった行は元の位置に、イベントごと作り直した行はそのイベントの中での並びに置く
+        old_pos = pd.Series(np.arange(len(old)), index=old_key).reindex(fresh_key).to_numpy()
+        fresh_pos = np.where(is_pair & ~np.isnan(old_pos), old_pos, len(old) + np.arange(len(fresh)))
+        sel = is_whole | is_pair
+        parts.append(fresh[sel])
+        pos.append(fresh_pos[sel])
+        n_fresh = int(sel.sum())
+    df = pd.concat(parts, ignore_index=True)
+    seq = dict(conn.execute("SELECT event, seq FROM events"))
+    order = np.lexsort((np.concatenate(pos), df["Event"].astype(str).map(seq).to_numpy(dtype=float)))
+    return df.iloc[order].reset_index(drop=True), n_fresh
+
+def load_delta_table(conn, arrow_path, stations=None, raw=False, classes=("AzimuthClass", "DipClass", "Depth")):
+    """delta_table と同じ表を列指向ファイルから読む（ストアが変わっていれば先に書き直す）
+
+    書き直すときは、ファイルの世代より後に changes に入った行だけを SQLite から作り直して差し替える。
+    pyarrow がなければ delta_table でそのまま SQLite から作る。
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return delta_table(conn, stations, raw, classes)
+    generation = store_generation(conn)
+    table = read_arrow(arrow_path) if os.path.exists(arrow_path) else None
+    meta = (table.schema.metadata or {}) if table is not None else {}
+    since = meta.get(b"generation")
+    since = None if since is None or meta.get(b"format") != ARROW_FORMAT.encode() else int(since)
+    if since != generation:
+        df, n_fresh = _updated_delta(conn, table, since)
+        write_arrow(df, arrow_path, generation)
+        print(f"💾 {arrow_path} を書き出しました（世代 {generation}、作り直した行 {n_fresh}）")
+        table = read_arrow(arrow_path)
+    cols = ["Station", "Event"] + (TIME_COLS if raw else []) + DELTA_COLS + list(classes)
+    df = table.select(cols).to_pandas(split_blocks=True)
+    if stations is not None:
+        df = df[df["Station"].isin(stations)].reset_index(drop=True)
+    return df
+
+# ===== ベンチマーク（CSV の書き出し→読み込み と 列指向ファイル の比較） =====
+def benchmark_load(n_rows=1_000_000, out_dir=None):
+    """python -c "import pick_store; pick_store.benchmark_load()" """
+    import tempfile
+    import time
+    out_dir = out_dir or tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    stations = np.array(['v.ska2', 'v.sft2', 'v.skd2', 'v.skrd', 'v.skrb', 'v.skrc'])
+    df = pd.DataFrame({"Station": stations[np.arange(n_rows) % len(stations)],
+                       "Event": [f"2025{i // len(stations):08d}_SAKURAJIMA" for i in range(n_rows)]})
+    for col in TIME_COLS:
+        t = np.round(rng.uniform(0, 300, n_rows), 3)
+        t[rng.random(n_rows) < 0.1] = np.nan
+        df[col] = t
+    for s, c in DELTAS:
+        df[f"{s}_{c}-u"] = df[f"{s}_{c}"] - df[f"{s}_u"]
+    df["AzimuthClass"] = rng.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"], n_rows)
+    df["DipClass"] = rng.choice(["Beside", "Middle", "Beneath"], n_rows)
+    df["Depth"] = np.round(rng.uniform(0, 150, n_rows), 1)
+    df["Azimuth"] = np.round(rng.uniform(0, 360, n_rows), 1)
+
+    csv_path = os.path.join(out_dir, "all_stations_delta_table.csv")
+    arrow_path = os.path.join(out_dir, "all_stations_delta_table.arrow")
+    results = []
+    t0 = time.perf_counter()
+    df.to_csv(csv_path, index=False)
+    t1 = time.perf_counter()
+    pd.read_csv(csv_path)
+    t2 = time.perf_counter()
+    results.append(("CSV", t1 - t0, t2 - t1, os.path.getsize(csv_path)))
+    t0 = time.perf_counter()
+    write_arrow(df, arrow_path)
+    t1 = time.perf_counter()
+    read_arrow(arrow_path).to_pandas(split_blocks=True)
+    t2 = time.perf_counter()
+    results.append(("Arrow IPC", t1 - t0, t2 - t1, os.path.getsize(arrow_path)))
+
+    print(f"{n_rows:,} rows x {len(df.columns)} columns ({n_rows * len(TIME_COLS):,} picks)")
+    for name, tw, tr, size in results:
+        print(f"{name:10s}: write {tw:6.2f} s, load {tr:6.3f} s, {size / 1e6:7.1f} MB")
+
+if __name__ == "__main__":
+    conn = open_store(STORE_PATH)
+    sync(conn, JSON_PATH, CLASS_CSV if os.path.exists(CLASS_CSV) else None)
+    df = delta_table(conn)
+    print(df)
+    print(f"{len(df)} 観測点×イベント, 分類あり {int(df['AzimuthClass'].notna().sum())}")
@@ -0,0 +1,31 @@
+from functools import lru_cache
+import numpy as np
+from scipy import signal
+
+# ===== 前処理（トレンド除去 → テーパー → ゼロ位相バンドパス） =====
+
+@lru_cache(maxsize=64)
+def bandpass_sos(sr, band, order=4):
+    """Butterworth バンドパスの係数（SOS）。(サンプリングレート, 帯域, 次数) ごとに一度だけ設計する"""
+    lo, hi = band
+    hi = min(hi, 0.499 * sr)   # ナイキスト周波数の手前まで
+    return signal.butter(order, (lo, hi), btype="bandpass", fs=sr, output="sos")
+
+@lru_cache(maxsize=64)
+def _taper(n, fraction):
+    return signal.windows.tukey(n, alpha=min(2 * fraction, 1.0)) if fraction > 0 else np.ones(n)
+
+def preprocess(x, sr, band, order=4, taper_fraction=0.05):
+    """x (..., n) を最後の軸に沿ってまとめて処理する（3成分を1回で）
+
+    平均・直線トレンド除去 → 両端 taper_fraction の cosine テーパー → sosfiltfilt。
+    欠損 (NaN) はその成分の平均で埋めて処理し、結果でも NaN に戻す。
+    """
+    x = np.asarray(x, dtype=float)
+    gaps = np.isnan(x)
+    y = np.where(gaps, np.nanmean(x, axis=-1, keepdims=True), x)
+    y = signal.detrend(y, axis=-1, type="linear")
+    y = y * _taper(y.shape[-1], taper_fraction)
+    if y.shape[-1] > 3 * (2 * order + 1):
+        y = signal.sosfiltfilt(bandpass_sos(sr, tuple(band), order), y, axis=-1)
+    return np.where(gaps, np.nan, y)
@@ -1,6 +1,8 @@
 import os
-import math
+import numpy as np
 import pandas as pd
+from geodesy import azimuth_deg, elevation_angle_deg, haversine_km
+from classify import classify, classify_direction, AZIMUTH_8, ELEVATION_CLASSES
 
 # ===== 設定 =====
 DATA_DIR = "/workspaces/固体地球物理学講座/earthquake_data"
@@ -10,42 +12,40 @@ SAKURAJIMA_LAT = 31.593
 SAKURAJIMA_LON = 130.657
 MAX_PER_PLACE = 3
 TOP_N = 30
+# 上位選択の単位（例: ["azimuth_class", "angle_class"] で 8方位 × 仰角クラスごと）
+GROUP_BY = ["direction"]
 
-# ===== Haversine距離計算 =====
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    φ1, φ2 = math.radians(lat1), math.radians(lat2)
-    dφ     = math.radians(lat2 - lat1)
-    dλ     = math.radians(lon2 - lon1)
-    a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
+# ===== グループごとの上位選択（place ごとの上限つき） =====
+def select_top(df, group_cols, max_per_place, top_n):
+    """group_cols ごとにマグニチュードの大きい順で、place ごと max_per_place 件・全体 top_n 件までを選ぶ
 
-# ===== 仰角計算 =====
-def compute_elevation_angle(depth_km, horizontal_km):
-    """水平距離と深さから仰角(度)を計算"""
-    if horizontal_km == 0 or pd.isna(horizontal_km):
-        return 90.0
-    if pd.isna(depth_km):
-        return 0.0
-    return math.degrees(math.atan2(depth_km, horizontal_km))
-
-# ===== 方位分類 (北/東/南/西) =====
-def classify_direction(lat, lon, base_lat, base_lon):
-    dlat = lat - base_lat
-    dlon = lon - base_lon
-    if abs(dlat) >= abs(dlon):
-        return "North" if dlat > 0 else "South"
+    結果はグループ順・マグニチュード降順（同じ値は元の行順）に並ぶ。
+    並べ替えはマグニチュードを 0.1 刻みの整数キーにした安定ソート（基数ソート）と
+    グループ番号での安定ソートの2回だけで、グループごとのコピーや全体ソートはしない。
+    """
+    group = df.groupby(group_cols, sort=True, observed=True).ngroup().to_numpy()
+    mag = df["magnitude"].to_numpy(dtype=float)
+    key = np.round(mag * 10)
+    if np.allclose(key[~np.isnan(mag)], mag[~np.isnan(mag)] * 10):
+        # 降順・欠損は最後
+        key = np.where(np.isnan(mag), np.iinfo(np.int16).max, -key).astype(np.int16)
     else:
-        return "East" if dlon > 0 else "West"
+        key = np.where(np.isnan(mag), np.inf, -mag)
+    order = np.argsort(key, kind="stable")
+    if group.max(initial=0) < np.iinfo(np.int16).max:
+        group = group.astype(np.int16)
+    order = order[np.argsort(group[order], kind="stable")]
+    order = order[group[order] >= 0]          # グループ列が欠損の行は除く
 
-# ===== 仰角カテゴリ =====
-def classify_elevation(angle):
-    if angle > 45:
-        return "Beneath(>45°)"
-    elif angle > 30:
-        return "Medium(30°-45°)"
-    else:
-        return "Beside(≤30°)"
+    # (グループ, place) ごとの順位 → 上限内だけ残し、グループごとの順位 → 上位 top_n
+    g = group[order]
+    place_code = pd.factorize(df["place"].to_numpy()[order])[0]
+    # place が欠損の行は groupby("place") と同じく除く
+    in_cap = ((place_code >= 0)
+              & (pd.Series(place_code).groupby([g, place_code]).cumcount().to_numpy() < max_per_place))
+    order, g = order[in_cap], g[in_cap]
+    in_top = pd.Series(g).groupby(g).cumcount().to_numpy() < top_n
+    return df.iloc[order[in_top]].reset_index(drop=True)
 
 # ===== メイン処理 =====
 def main():
@@ -53,49 +53,30 @@ def main():
     df = pd.read_csv(INPUT_CSV, parse_dates=["time"])
     print(f"Loaded {len(df)} records from {INPUT_CSV}")
 
-    # 距離再計算
-    df["distance_km"] = df.apply(
-        lambda r: haversine(SAKURAJIMA_LAT, SAKURAJIMA_LON, r.latitude, r.longitude),
-        axis=1
-    )
+    # 距離再計算（全件まとめて）
+    df["distance_km"] = haversine_km(SAKURAJIMA_LAT, SAKURAJIMA_LON, df["latitude"], df["longitude"])
 
     # 仰角計算
-    df["elevation_angle_deg"] = df.apply(
-        lambda r: compute_elevation_angle(r["depth_km"], r["distance_km"]),
-        axis=1
-    )
+    df["elevation_angle_deg"] = elevation_angle_deg(df["depth_km"], df["distance_km"])
 
     # 仰角カテゴリ
-    df["angle_class"] = df["elevation_angle_deg"].apply(classify_elevation)
+    df["angle_class"] = classify(df["elevation_angle_deg"], ELEVATION_CLASSES)
 
     # 方位 (北/東/南/西) 分類
-    df["direction"] = df.apply(
-        lambda r: classify_direction(r["latitude"], r["longitude"], SAKURAJIMA_LAT, SAKURAJIMA_LON),
-        axis=1
-    )
-
-    # 各方向ごとにフィルタ
-    frames = []
-    for dir_name in ["North", "East", "South", "West"]:
-        sub = df[df["direction"] == dir_name].copy()
-        if sub.empty:
-            continue
-        # マグニチュード降順
-        sub = sub.sort_values("magnitude", ascending=False)
-        # place ごと最大3件
-        sub = sub.groupby("place", group_keys=False).head(MAX_PER_PLACE)
-        # direction 内上位 TOP_N 件
-        sub = sub.head(TOP_N)
-        frames.append(sub)
+    df["direction"] = classify_direction(df["latitude"], df["longitude"], SAKURAJIMA_LAT, SAKURAJIMA_LON)
 
-    result = pd.concat(frames, ignore_index=True)
+    # 8方位（桜島から見た方位角）
+    if "azimuth_class" in GROUP_BY:
+        df["azimuth_class"] = classify(
+            azimuth_deg(SAKURAJIMA_LAT, SAKURAJIMA_LON, df["latitude"], df["longitude"]), AZIMUTH_8)
 
-    # ソート: direction, magnitude 降順
-    result = result.sort_values(["direction","magnitude"], ascending=[True, False])
+    # グループごとに place 最大 MAX_PER_PLACE 件・上位 TOP_N 件（グループ順, magnitude 降順）
+    result = select_top(df, GROUP_BY, MAX_PER_PLACE, TOP_N)
 
     # 保存
     cols = ["time","latitude","longitude","depth_km","magnitude",
             "distance_km","elevation_angle_deg","angle_class","direction","place"]
+    cols += [c for c in GROUP_BY if c not in cols]
     result.to_csv(OUTPUT_CSV, columns=cols, index=False, encoding='utf-8-sig')
     print(f"Saved {OUTPUT_CSV} ({len(result)} records)")
 
@@ -1,7 +1,15 @@
 import os
+import json
 import math
+import heapq
+import hashlib
+import time as _time
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from geodesy import EARTH_RADIUS_KM, haversine_km
+from spatial_index import EventIndex, screen_centers
 
 # ===== 設定 =====
 DATA_DIR           = "/workspaces/固体地球物理学講座/earthquake_data"
@@ -11,15 +19,16 @@ SAKURAJIMA_LAT     = 31.593
 SAKURAJIMA_LON     = 130.657
 SEARCH_RADIUS_KM   = 250.0
 MIN_MAGNITUDE      = 3.0
-
-# ===== haversine距離計算 =====
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    φ1, φ2 = math.radians(lat1), math.radians(lat2)
-    dφ     = math.radians(lat2 - lat1)
-    dλ     = math.radians(lon2 - lon1)
-    a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
+N_WORKERS          = os.cpu_count()   # 年次ファイルの並列読み込み数（1 なら逐次）
+CACHE_DIR          = os.path.join(DATA_DIR, "catalog_cache")   # None ならキャッシュしない
+CACHE_MAX_BYTES    = 2 * 1024**3      # キャッシュ全体の上限（古いものから削除）
+STREAMING          = False   # True: 読み込み中に M・範囲で絞り込み、該当イベントだけ保持（キャッシュは読むだけ）
+STREAM_BLOCK_BYTES = 8 * 1024**2      # ストリーミング時に一度に読むバイト数
+SCREEN_CENTERS     = {}      # 桜島以外にまとめて検索する中心 {名前: (緯度, 経度)}（一括読み込み時のみ）
+STATION_CSV        = None    # station_metadata の CSV（station_name,lat,lon）を指定すると全観測点も中心に加える
+INCREMENTAL        = False   # True: 前回からの追記分・新しい年次ファイルだけを検索して INCREMENTAL_CSV に差し込む
+INCREMENTAL_CSV    = os.path.join(DATA_DIR, "sakurajima_events_2011_present.csv")
+BENCHMARK          = False   # True: 1行パースと一括デコードの速度比較のみ実行
 
 # ===== 1行パース（秒無視・分を度に換算） =====
 def parse_fixed_line(line:str):
@@ -78,6 +87,116 @@ def parse_fixed_line(line:str):
     except Exception:
         return None
 
+# ===== 一括デコード（parse_fixed_line と同じ列位置・同じ欠損扱い） =====
+# 数値フィールドの文字位置（parse_fixed_line のスライスと同じ）
+_FIELDS = {
+    "year": (1, 5), "month": (5, 7), "day": (7, 9), "hour": (9, 11), "minute": (11, 13),
+    "lat_deg": (21, 24), "lat_min": (24, 28), "lon_deg": (32, 36), "lon_min": (36, 40),
+    "depth": (44, 47), "mag": (52, 54),
+}
+_DECODE_WIDTH = 54   # 数値フィールドは54文字目（マグニチュード）まで
+
+def _decode_fields(codes):
+    """全フィールドを右詰め整数として一括変換 → ({名前: (値, 桁数)}, 高速パス可否)"""
+    # 列ごとに連続アクセスできるよう (文字位置, 行) の向きで持つ
+    c = np.minimum(codes.T, 255).astype(np.uint8)
+    digits = c - 48
+    is_digit = digits < 10            # uint8 の折り返しで '0'-'9' 以外は False
+    is_space = c == 32
+    ok = np.ones(codes.shape[0], dtype=bool)
+    fields = {}
+    for name, (start, stop) in _FIELDS.items():
+        d = is_digit[start:stop]
+        # 前スペース＋数字のみ高速パス（数字の後ろに空白・符号などがあれば1行パースに回す）
+        ok &= np.all(d | is_space[start:stop], axis=0)
+        ok &= ~np.any(d[:-1] & is_space[start+1:stop], axis=0)
+        value = np.where(d[0], digits[start], 0).astype(np.int64)
+        for j in range(start + 1, stop):
+            value = value * 10 + np.where(is_digit[j], digits[j], 0)
+        fields[name] = (value, d.sum(axis=0))
+    return fields, ok
+
+def _decode_columns(lines):
+    """J 行だけを取り出し、数値列の配列と有効行マスクを返す（地名はまだ作らない）
+
+    高速パスで解釈できない行（符号付き・短い行・不正な日付など）は
+    parse_fixed_line にそのまま渡すので、結果は1行パースと一致する。
+    """
+    lines = [l for l in lines if l.startswith("J")]
+    n = len(lines)
+    codes = np.array(lines, dtype=f"U{_DECODE_WIDTH}").view(np.uint32).reshape(n, _DECODE_WIDTH)
+    fields, ok = _decode_fields(codes)
+
+    # ---- 時刻 ----
+    (year, nd_y), (month, nd_mo), (day, nd_d), (hour, nd_h), (minute, nd_mi) = (
+        fields[k] for k in ("year", "month", "day", "hour", "minute"))
+    ok &= (nd_y > 0) & (nd_mo > 0) & (nd_d > 0) & (nd_h > 0) & (nd_mi > 0)
+    month_start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype("M8[M]")
+    days_in_month = ((month_start + 1).astype("M8[D]") - month_start.astype("M8[D]")).astype(np.int64)
+    ok &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+    ok &= (hour <= 23) & (minute <= 59)
+    times = (month_start.astype("M8[D]") + (day - 1)).astype("M8[m]") + (hour * 60 + minute)
+    times = times.astype("M8[ns]")
+
+    # ---- 緯度・経度（度+分、分は4桁のときだけ xx.yy として採用） ----
+    (lat_deg, _), (lat_min, nd_lam) = fields["lat_deg"], fields["lat_min"]
+    (lon_deg, _), (lon_min, nd_lom) = fields["lon_deg"], fields["lon_min"]
+    latitude  = lat_deg + np.where(nd_lam == 4, lat_min / 100, 0.0) / 60.0
+    longitude = lon_deg + np.where(nd_lom == 4, lon_min / 100, 0.0) / 60.0
+
+    # ---- 深さ・マグニチュード（空欄は NaN） ----
+    (depth, nd_dep), (mag, nd_mag) = fields["depth"], fields["mag"]
+    depth_km  = np.where(nd_dep > 0, depth, np.nan)
+    magnitude = np.where(nd_mag > 0, mag / 10.0, np.nan)
+
+    # ---- 高速パス外の行は1行パースで補完 ----
+    keep = np.ones(n, dtype=bool)
+    for i in np.flatnonzero(~ok):
+        ev = parse_fixed_line(lines[i])
+        if ev is None:
+            keep[i] = False
+            continue
+        times[i]     = np.datetime64(ev["time"], "ns")
+        latitude[i]  = ev["latitude"]
+        longitude[i] = ev["longitude"]
+        depth_km[i]  = np.nan if ev["depth_km"] is None else ev["depth_km"]
+        magnitude[i] = np.nan if ev["magnitude"] is None else ev["magnitude"]
+
+    cols = {"time": times, "latitude": latitude, "longitude": longitude,
+            "depth_km": depth_km, "magnitude": magnitude}
+    return lines, cols, keep
+
+def _events_frame(lines, cols, idx):
+    """idx の行だけ地名を切り出して DataFrame にする"""
+    frame = {k: v[idx] for k, v in cols.items()}
+    frame["place"] = np.array([lines[i][68:92].strip() for i in idx], dtype=object)
+    return pd.DataFrame(frame)
+
+def decode_lines(lines):
+    """テキスト行のリストを列ごとの配列に一括変換して DataFrame を返す
+
+    depth_km は欠損を NaN とした float64 で返す。
+    """
+    lines, cols, keep = _decode_columns(lines)
+    return _events_frame(lines, cols, np.flatnonzero(keep))
+
+def split_lines(raw:bytes):
+    """Shift-JIS のバイト列をデコードして行に分ける（open() のテキストモードと同じ改行の扱い）"""
+    text = raw.decode("shift_jis", errors="ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.split("\n")
+
+def decode_bytes(raw:bytes):
+    """Shift-JIS のバイト列を丸ごとデコードして decode_lines に渡す"""
+    return decode_lines(split_lines(raw))
+
+def restore_depth_dtype(df):
+    """欠損がなければ depth_km を整数列に戻す（辞書リストから作った DataFrame と同じ型）"""
+    if len(df) and df["depth_km"].notna().all():
+        df["depth_km"] = df["depth_km"].astype(np.int64)
+    return df
+
 # ===== 年次ファイル読み込み =====
 def read_year_file(year:int):
     path = os.path.join(DATA_DIR, f"h{year}")
@@ -90,38 +209,513 @@ def read_year_file(year:int):
     print(f"{year}: {len(events)} parsed")
     return events
 
+# ===== 年次ファイル一括読み込み =====
+def decode_file(path:str):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return decode_bytes(raw)
+
+def decode_year_file(year:int):
+    df = decode_file(os.path.join(DATA_DIR, f"h{year}"))
+    print(f"{year}: {len(df)} parsed")
+    return df
+
+# ===== 解析済みカタログのキャッシュ（h{year} ごとの列データ .npz） =====
+_CACHE_VERSION = 1   # デコード結果の形式を変えたら上げる
+
+def _content_hash(path:str, n_bytes=None):
+    """ファイル（n_bytes を指定すれば先頭 n_bytes バイト）のハッシュ"""
+    h = hashlib.blake2b(digest_size=16)
+    remaining = float("inf") if n_bytes is None else n_bytes
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(int(min(1 << 20, remaining)))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+def load_cache_index():
+    """{"version", "files": {絶対パス: {size, mtime_ns, hash, last_used}}} を読む"""
+    try:
+        with open(os.path.join(CACHE_DIR, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        index = {}
+    if index.get("version") != _CACHE_VERSION:
+        index = {"version": _CACHE_VERSION, "files": {}}
+    return index
+
+def save_cache_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = os.path.join(CACHE_DIR, "index.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(CACHE_DIR, "index.json"))
+
+def cache_load(path:str, index):
+    """キャッシュがあれば DataFrame を、なければ（または元ファイルが差し替えられていれば）None を返す"""
+    entry = index["files"].get(os.path.abspath(path))
+    if entry is None:
+        return None
+    st = os.stat(path)
+    if (entry["size"], entry["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+        # サイズか更新時刻が違う → 中身のハッシュで差し替えを判定
+        if entry["size"] != st.st_size or _content_hash(path) != entry["hash"]:
+            return None
+        entry["mtime_ns"] = st.st_mtime_ns
+    try:
+        with np.load(os.path.join(CACHE_DIR, entry["hash"] + ".npz"), allow_pickle=False) as z:
+            df = pd.DataFrame({
+                "time": z["time"].view("M8[ns]"),
+                "latitude": z["latitude"],
+                "longitude": z["longitude"],
+                "depth_km": z["depth_km"],
+                "magnitude": z["magnitude"],
+                "place": z["place_names"].astype(object)[z["place_codes"]],
+            })
+    except (OSError, KeyError, ValueError):
+        return None
+    entry["last_used"] = _time.time()
+    return df
+
+def cache_store(path:str, df, index):
+    """デコード結果を保存し、古いエントリを整理して CACHE_MAX_BYTES 以下に収める"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    digest = _content_hash(path)
+    codes, names = pd.factorize(df["place"])
+    tmp = os.path.join(CACHE_DIR, digest + ".tmp.npz")
+    np.savez(tmp,
+             time=df["time"].to_numpy("M8[ns]").view(np.int64),
+             latitude=df["latitude"].to_numpy(),
+             longitude=df["longitude"].to_numpy(),
+             depth_km=df["depth_km"].to_numpy(np.float64),
+             magnitude=df["magnitude"].to_numpy(),
+             place_codes=codes.astype(np.int32),
+             place_names=np.array(names, dtype=str))
+    os.replace(tmp, os.path.join(CACHE_DIR, digest + ".npz"))
+
+    old = index["files"].get(key)
+    index["files"][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                           "hash": digest, "last_used": _time.time()}
+    if old and old["hash"] != digest:
+        _drop_unused_cache_file(old["hash"], index)
+    _enforce_cache_limit(index)
+
+def _drop_unused_cache_file(digest, index):
+    if all(e["hash"] != digest for e in index["files"].values()):
+        try:
+            os.remove(os.path.join(CACHE_DIR, digest + ".npz"))
+        except FileNotFoundError:
+            pass
+
+def _enforce_cache_limit(index):
+    def size_of(entry):
+        try:
+            return os.path.getsize(os.path.join(CACHE_DIR, entry["hash"] + ".npz"))
+        except OSError:
+            return 0
+    total = sum(size_of(e) for e in index["files"].values())
+    for key, entry in sorted(index["files"].items(), key=lambda kv: kv[1]["last_used"]):
+        if total <= CACHE_MAX_BYTES:
+            break
+        total -= size_of(entry)
+        del index["files"][key]
+        _drop_unused_cache_file(entry["hash"], index)
+
+# ===== 読み込み中の絞り込み（ストリーミング検索） =====
+def iter_file_blocks(path:str, block_bytes:int=STREAM_BLOCK_BYTES, start:int=0, partial:bool=True):
+    """start バイト目から行の途中で切らないブロックに分けて読み、(行のリスト, 読み終えた位置) を順に返す
+
+    partial=False なら改行で終わっていない最終行（書き込み途中の行）は返さない。
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos, rest = start, b""
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b"\n") + 1
+            rest = block[cut:]
+            if cut:
+                pos += cut
+                yield split_lines(block[:cut]), pos
+        if rest and partial:
+            yield split_lines(rest), pos + len(rest)
+
+def _select_events(cols, keep, query):
+    """M・外接矩形・haversine 距離で絞り込み → (該当行の位置, 距離)"""
+    lat0, lon0, radius_km, min_mag = query
+    lat, lon = cols["latitude"], cols["longitude"]
+    sel = keep & (cols["magnitude"] >= min_mag)   # NaN は比較で False
+
+    # 外接矩形（緯度は円の半径そのもの、経度は円に接する子午線まで）
+    d = radius_km / EARTH_RADIUS_KM
+    sel &= np.abs(lat - lat0) <= math.degrees(d) + 1e-9
+    s = math.sin(d) / math.cos(math.radians(lat0))
+    if s < 1.0:
+        dlon = math.degrees(math.asin(s)) + 1e-9
+        sel &= np.abs((lon - lon0 + 180.0) % 360.0 - 180.0) <= dlon
+
+    # 矩形内の候補だけ haversine で判定
+    idx = np.flatnonzero(sel)
+    dist = haversine_km(lat0, lon0, lat[idx], lon[idx])
+    inside = dist <= radius_km
+    return idx[inside], dist[inside]
+
+def _new_search_stats():
+    return {"parsed": 0, "magnitude": 0, "depth_nan": False}
+
+def _count_search_stats(stats, cols, keep, min_mag):
+    stats["parsed"] += int(keep.sum())
+    stats["magnitude"] += int((keep & (cols["magnitude"] >= min_mag)).sum())
+    stats["depth_nan"] = stats["depth_nan"] or bool(np.isnan(cols["depth_km"][keep]).any())
+
+def search_lines(lines, query, stats):
+    """行のリストをデコードして条件に合うイベントだけを DataFrame にする
+
+    query = (中心緯度, 中心経度, 半径km, 最小M)。
+    落とした行は地名の切り出しも DataFrame 化もしない。
+    """
+    lines, cols, keep = _decode_columns(lines)
+    _count_search_stats(stats, cols, keep, query[3])
+    idx, dist = _select_events(cols, keep, query)
+    df = _events_frame(lines, cols, idx)
+    df["distance_km"] = dist
+    return df
+
+def search_file(path:str, query):
+    """ブロックごとにデコードして条件に合うイベントだけを残す → (DataFrame, 集計)"""
+    stats = _new_search_stats()
+    found = [search_lines(lines, query, stats) for lines, _ in iter_file_blocks(path)]
+    if not found:
+        return search_lines([], query, stats), stats
+    return pd.concat(found, ignore_index=True), stats
+
+def search_frame(df, query, stats):
+    """キャッシュから読んだ年の DataFrame に同じ絞り込みをかける"""
+    cols = {k: df[k].to_numpy() for k in ("latitude", "longitude", "depth_km", "magnitude")}
+    keep = np.ones(len(df), dtype=bool)
+    _count_search_stats(stats, cols, keep, query[3])
+    idx, dist = _select_events(cols, keep, query)
+    df = df.iloc[idx].reset_index(drop=True)
+    df["distance_km"] = dist
+    return df
+
+# ===== 複数年の並列読み込み =====
+def _map_years(todo, func, args, n_workers, on_done):
+    """各年の h{year} について func(パス, *args) を実行し、終わった順に on_done(年, 結果取得関数) を呼ぶ"""
+    def path(yr):
+        return os.path.join(DATA_DIR, f"h{yr}")
+    if n_workers and n_workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(todo))) as ex:
+            futures = {ex.submit(func, path(yr), *args): yr for yr in todo}
+            for fut in as_completed(futures):
+                on_done(futures[fut], fut.result)
+    else:
+        for yr in todo:
+            on_done(yr, lambda: func(path(yr), *args))
+
+def _cached_years(years, index, keep=None):
+    """キャッシュにある年を読み込む → ({年: DataFrame}, デコードが必要な年)
+
+    keep を渡すと1年読むごとに keep(df) の結果だけを残す（全年分の DataFrame を同時に持たない）。
+    """
+    hits, todo = {}, []
+    for yr in years:
+        try:
+            df = cache_load(os.path.join(DATA_DIR, f"h{yr}"), index) if index is not None else None
+        except OSError as e:
+            print(f"{yr}: failed ({e})")
+            continue
+        if df is None:
+            todo.append(yr)
+        elif keep is None:
+            hits[yr] = df
+            print(f"{yr}: {len(df)} parsed (cache)")
+        else:
+            hits[yr] = keep(df)
+            print(f"{yr}: {len(df)} parsed, {len(hits[yr])} matched (cache)")
+            del df
+    return hits, todo
+
+def load_years(years, n_workers=N_WORKERS):
+    """年次ファイルをプロセスプールで同時にデコードし、年順の列チャンクのリストを返す
+
+    キャッシュにある年はデコードせずに読み込む。
+    読めなかった年は "{year}: failed (...)" を表示して飛ばす。
+    """
+    index = load_cache_index() if CACHE_DIR else None
+    chunks, todo = _cached_years(years, index)
+
+    def collect(year, get):
+        try:
+            chunks[year] = get()
+        except Exception as e:
+            print(f"{year}: failed ({e})")
+            return
+        print(f"{year}: {len(chunks[year])} parsed")
+        if index is not None:
+            cache_store(os.path.join(DATA_DIR, f"h{year}"), chunks[year], index)
+
+    _map_years(todo, decode_file, (), n_workers, collect)
+    if index is not None:
+        save_cache_index(index)
+    return [chunks[yr] for yr in sorted(chunks)]
+
+def search_years(years, query, n_workers=N_WORKERS):
+    """load_years の絞り込み版。該当イベントの年順チャンクと全体の集計を返す"""
+    index = load_cache_index() if CACHE_DIR else None
+    stats = _new_search_stats()
+    chunks, todo = _cached_years(years, index, keep=lambda df: search_frame(df, query, stats))
+
+    def collect(year, get):
+        try:
+            chunks[year], st = get()
+        except Exception as e:
+            print(f"{year}: failed ({e})")
+            return
+        print(f"{year}: {st['parsed']} parsed, {len(chunks[year])} matched")
+        stats["parsed"] += st["parsed"]
+        stats["magnitude"] += st["magnitude"]
+        stats["depth_nan"] = stats["depth_nan"] or st["depth_nan"]
+
+    _map_years(todo, search_file, (query,), n_workers, collect)
+    if index is not None:
+        save_cache_index(index)
+    return [chunks[yr] for yr in sorted(chunks)], stats
+
+# ===== ベンチマーク（1行パース vs 一括デコード） =====
+def benchmark_decode(year:int, repeat:int=3):
+    path = os.path.join(DATA_DIR, f"h{year}")
+    with open(path, "rb") as f:
+        n_lines = f.read().count(b"\n")
+
+    t_line = t_bulk = float("inf")
+    for _ in range(repeat):
+        t0 = _time.perf_counter()
+        ref = pd.DataFrame(read_year_file(year))
+        t_line = min(t_line, _time.perf_counter() - t0)
+        t0 = _time.perf_counter()
+        bulk = restore_depth_dtype(decode_year_file(year))
+        t_bulk = min(t_bulk, _time.perf_counter() - t0)
+
+    ref["time"] = ref["time"].astype("M8[ns]")
+    pd.testing.assert_frame_equal(ref, bulk)
+    print(f"per-line : {t_line:.3f} s ({n_lines / t_line:,.0f} lines/s)")
+    print(f"bulk     : {t_bulk:.3f} s ({n_lines / t_bulk:,.0f} lines/s)")
+    print(f"speedup  : x{t_line / t_bulk:.1f}  (results identical: {len(bulk)} events)")
+
+# ===== 複数中心（火山・観測点）の一括検索 =====
+def screening_centers():
+    centers = dict(SCREEN_CENTERS)
+    if STATION_CSV:
+        stations = pd.read_csv(STATION_CSV)
+        for _, row in stations.iterrows():
+            centers[row["station_name"]] = (row["lat"], row["lon"])
+    return centers
+
+def save_screening(df):
+    df = df.sort_values(["center", "time"], kind="stable").reset_index(drop=True)
+    out = os.path.join(DATA_DIR, "events_by_center.csv")
+    _format_events(df).to_csv(out, index=False, encoding="utf-8-sig", float_format="%.6f")
+    print(f"Saved {out} ({len(df)} records, {df['center'].nunique()} centers)")
+
+# ===== CSV出力 =====
+def _format_events(df):
+    """マグニチュードだけ小数1位の文字列にする（それ以外は to_csv の float_format="%.6f"）"""
+    df = df.copy()
+    df["magnitude"] = df["magnitude"].map(lambda x: f"{x:.1f}" if pd.notna(x) else "")
+    return df
+
+# ===== 差分更新（処理済みバイト位置を記録して追記分だけ検索） =====
+def search_appended(path:str, query, offsets):
+    """offsets[path] バイト目以降の完全な行だけを検索 → (DataFrame, 集計, 処理済み位置)"""
+    stats = _new_search_stats()
+    end = offsets.get(path, 0)
+    found = []
+    for lines, end in iter_file_blocks(path, start=end, partial=False):
+        found.append(search_lines(lines, query, stats))
+    df = pd.concat(found, ignore_index=True) if found else search_lines([], query, stats)
+    return df, stats, end
+
+def merge_into_csv(path:str, rows):
+    """時刻順の CSV に、時刻順に並べた新しい行（改行付き bytes）を差し込む
+
+    末尾から新しい行の最小時刻までだけ読み戻して書き換えるので、
+    ほぼ末尾に入る日次更新ではファイル全体を読み込まない。
+    """
+    def key(line):
+        return line[:19]    # "YYYY-MM-DD HH:MM:SS" は文字列比較で時刻順
+    first = key(rows[0])
+    with open(path, "r+b") as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0:
+            step = min(1 << 16, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = buf.splitlines(keepends=True)
+            # 先頭要素は途中から読んだ行（pos == 0 ならヘッダ）なので比較しない
+            if any(key(l) <= first for l in lines[1:]):
+                break
+        body = lines[1:]
+        k = 0
+        for i, l in enumerate(body):
+            if key(l) <= first:
+                k = i + 1
+        offset = pos + len(lines[0]) + sum(len(l) for l in body[:k])
+        f.seek(offset)
+        f.truncate()
+        f.writelines(heapq.merge(body[k:], rows, key=key))
+
+def _load_incremental_state(path:str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def update_incremental(n_workers=N_WORKERS, rebuild=False):
+    """INCREMENTAL_CSV を前回の続きから更新する
+
+    年次ファイルごとに処理済みバイト位置・サイズ・更新時刻・処理済み部分のハッシュを
+    INCREMENTAL_CSV + ".state.json" に記録し、変化のあったファイルの追記分だけを検索する。
+    条件（中心・半径・M）が変わった、出力がない、処理済み部分が書き換えられた場合は作り直す。
+    """
+    out = INCREMENTAL_CSV
+    state_path = out + ".state.json"
+    query = [SAKURAJIMA_LAT, SAKURAJIMA_LON, SEARCH_RADIUS_KM, MIN_MAGNITUDE]
+    last_year = max(END_YEAR, datetime.now().year)
+    years = [yr for yr in range(START_YEAR, last_year+1)
+             if os.path.exists(os.path.join(DATA_DIR, f"h{yr}"))]
+
+    state = None if rebuild else _load_incremental_state(state_path)
+    if state is None or state["query"] != query or not os.path.exists(out):
+        rebuild = True
+    offsets, todo, stat_before = {}, [], {}
+    for yr in years:
+        path = os.path.join(DATA_DIR, f"h{yr}")
+        st = os.stat(path)
+        stat_before[yr] = st
+        entry = None if rebuild else state["files"].get(f"h{yr}")
+        if entry is None:
+            todo.append(yr)
+            continue
+        if (st.st_size, st.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+            continue
+        if st.st_size < entry["offset"] or _content_hash(path, entry["offset"]) != entry["prefix_hash"]:
+            print(f"{yr}: processed part was rewritten, rebuilding")
+            return update_incremental(n_workers, rebuild=True)
+        offsets[path] = entry["offset"]
+        todo.append(yr)
+    if rebuild:
+        state = {"query": query, "depth_float": False, "files": {}}
+
+    results = {}
+    def collect(year, get):
+        try:
+            results[year] = get()
+        except Exception as e:
+            print(f"{year}: failed ({e})")
+            return
+        df, st, _ = results[year]
+        print(f"{year}: {st['parsed']} new parsed, {len(df)} matched")
+
+    _map_years(todo, search_appended, (query, offsets), n_workers, collect)
+
+    depth_nan = any(st["depth_nan"] for _, st, _ in results.values())
+    if not rebuild and depth_nan and not state["depth_float"]:
+        # 深さの欠損が初めて出た → 全行の深さ表記が変わるので作り直す
+        print("blank depth appeared, rebuilding")
+        return update_incremental(n_workers, rebuild=True)
+    if rebuild:
+        state["depth_float"] = depth_nan
+
+    frames = [results[yr][0] for yr in sorted(results)]
+    new = pd.concat(frames, ignore_index=True) if frames else search_lines([], query, _new_search_stats())
+    if not state["depth_float"]:
+        new["depth_km"] = new["depth_km"].astype(np.int64)
+
+    if rebuild:
+        new = new.sort_values("time").reset_index(drop=True)
+        _format_events(new).to_csv(out, index=False, encoding="utf-8-sig", float_format="%.6f")
+        print(f"Saved {out} ({len(new)} records)")
+    elif len(new):
+        new = new.sort_values("time", kind="stable")
+        text = _format_events(new).to_csv(index=False, header=False, float_format="%.6f")
+        rows = [(l + os.linesep).encode("utf-8") for l in text.split(os.linesep) if l]
+        merge_into_csv(out, rows)
+        print(f"Updated {out} (+{len(new)} records)")
+    else:
+        print(f"{out} is up to date")
+
+    for yr, (_, _, end) in results.items():
+        st = stat_before[yr]
+        path = os.path.join(DATA_DIR, f"h{yr}")
+        state["files"][f"h{yr}"] = {"offset": end, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                    "prefix_hash": _content_hash(path, end)}
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, state_path)
+
 # ===== メイン処理 =====
 def main():
-    all_events=[]
-    for yr in range(START_YEAR, END_YEAR+1):
-        all_events += read_year_file(yr)
-    df = pd.DataFrame(all_events)
-    print(f"All parsed: {len(df)}")
-
-    # M>=3 のみ
-    df = df[df["magnitude"].notna() & (df["magnitude"] >= MIN_MAGNITUDE)]
-    print(f"M>=3: {len(df)}")
-
-    # 距離フィルタ
-    df["distance_km"] = df.apply(
-        lambda r: haversine(SAKURAJIMA_LAT, SAKURAJIMA_LON, r.latitude, r.longitude),
-        axis=1
-    )
-    df = df[df["distance_km"] <= SEARCH_RADIUS_KM]
+    years = range(START_YEAR, END_YEAR+1)
+    if STREAMING:
+        query = (SAKURAJIMA_LAT, SAKURAJIMA_LON, SEARCH_RADIUS_KM, MIN_MAGNITUDE)
+        frames, stats = search_years(years, query)
+        if not frames:
+            print("No year files could be read")
+            return
+        df = pd.concat(frames, ignore_index=True)
+        if not stats["depth_nan"]:
+            df["depth_km"] = df["depth_km"].astype(np.int64)
+        print(f"All parsed: {stats['parsed']}")
+        print(f"M>=3: {stats['magnitude']}")
+    else:
+        frames = load_years(years)
+        if not frames:
+            print("No year files could be read")
+            return
+        df = restore_depth_dtype(pd.concat(frames, ignore_index=True))
+        print(f"All parsed: {len(df)}")
+
+        # M>=3 のみ
+        df = df[df["magnitude"].notna() & (df["magnitude"] >= MIN_MAGNITUDE)]
+        print(f"M>=3: {len(df)}")
+
+        # 距離フィルタ（空間インデックスで半径検索）
+        index = EventIndex(df["latitude"], df["longitude"])
+        centers = screening_centers()
+        if centers:
+            save_screening(screen_centers(df, centers, SEARCH_RADIUS_KM, index))
+        (idx, dist), = index.query_radius(SAKURAJIMA_LAT, SAKURAJIMA_LON, SEARCH_RADIUS_KM)
+        df = df.iloc[idx].copy()
+        df["distance_km"] = dist
     print(f"M>=3 & <=250km: {len(df)}")
 
     # ソート
     df = df.sort_values("time").reset_index(drop=True)
 
-     # --- マグニチュードだけ文字列にフォーマット ---
-    df["magnitude"] = df["magnitude"].map(lambda x: f"{x:.1f}" if pd.notna(x) else "")
-    
     # 保存先を読み込みディレクトリにする
     out = os.path.join(DATA_DIR, "sakurajima_events_2011_2022.csv")
 
-    # CSV保存（緯度経度は%.6f、小数1位のmagnitudeはすでに文字列なのでそのまま）
-    df.to_csv(out, index=False, encoding="utf-8-sig", float_format="%.6f")
+    # CSV保存（緯度経度は%.6f、小数1位のmagnitudeは文字列にしてそのまま）
+    _format_events(df).to_csv(out, index=False, encoding="utf-8-sig", float_format="%.6f")
     print(f"Saved {out} ({len(df)} records)")
 
 if __name__=="__main__":
-    main()
+    if BENCHMARK:
+        benchmark_decode(START_YEAR)
+    elif INCREMENTAL:
+        update_incremental()
+    else:
+        main()
@@ -0,0 +1,112 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from geodesy import EARTH_RADIUS_KM, haversine_km
+
+# ===== 緯度経度 → 単位球上の3次元座標 =====
+def _unit_vectors(lat, lon):
+    φ, λ = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(φ) * np.cos(λ), np.cos(φ) * np.sin(λ), np.sin(φ)])
+
+# ===== 空間インデックス =====
+class EventIndex:
+    """震源の緯度経度に対する空間インデックス（単位球上の k-d 木）
+
+    一度作れば、複数の中心（火山・観測点など）に対する半径検索と
+    近傍 k 件検索をまとめて実行できる。距離は haversine [km]。
+    """
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self._tree = cKDTree(_unit_vectors(self.lat, self.lon))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def query_radius(self, lats, lons, radius_km):
+        """各中心から radius_km 以内のイベント → 中心ごとの (位置の配列, 距離km) のリスト（位置は昇順）"""
+        lats, lons = np.atleast_1d(lats).astype(float), np.atleast_1d(lons).astype(float)
+        # 大円距離 → 弦の長さ（少し広めに取り、最後に haversine で判定）
+        chord = 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) * (1 + 1e-9) + 1e-12
+        hits = self._tree.query_ball_point(_unit_vectors(lats, lons), chord, return_sorted=True)
+        out = []
+        for lat0, lon0, idx in zip(lats, lons, hits):
+            idx = np.asarray(idx, dtype=np.intp)
+            dist = haversine_km(lat0, lon0, self.lat[idx], self.lon[idx])
+            inside = dist <= radius_km
+            out.append((idx[inside], dist[inside]))
+        return out
+
+    def query_nearest(self, lats, lons, k=1):
+        """各中心に近い順に k 件 → (位置 (中心数, k), 距離km (中心数, k))"""
+        lats, lons = np.atleast_1d(lats).astype(float), np.atleast_1d(lons).astype(float)
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((len(lats), 0), dtype=np.intp), np.empty((len(lats), 0))
+        _, idx = self._tree.query(_unit_vectors(lats, lons), k=k)
+        idx = np.asarray(idx, dtype=np.intp).reshape(len(lats), k)
+        dist = haversine_km(lats[:, None], lons[:, None], self.lat[idx], self.lon[idx])
+        order = np.argsort(dist, axis=1, kind="stable")
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(dist, order, axis=1)
+
+# ===== 複数中心の一括半径検索 =====
+def screen_centers(df, centers, radius_km, index=None):
+    """centers = {名前: (緯度, 経度)} の各中心から radius_km 以内のイベントを縦に並べて返す
+
+    戻り値は df の列に center, distance_km を加えたもの（中心ごとに元の行順）。
+    """
+    if index is None:
+        index = EventIndex(df["latitude"], df["longitude"])
+    names = list(centers)
+    lats = [centers[n][0] for n in names]
+    lons = [centers[n][1] for n in names]
+    frames = []
+    for name, (idx, dist) in zip(names, index.query_radius(lats, lons, radius_km)):
+        sub = df.iloc[idx].copy()
+        sub.insert(0, "center", name)
+        sub["distance_km"] = dist
+        frames.append(sub)
+    if not frames:
+        return df.iloc[:0].assign(center=[], distance_km=[])
+    return pd.concat(frames, ignore_index=True)
+
+# ===== ベンチマーク（df.apply による全件走査 vs インデックス） =====
+def benchmark(n_events=200_000, n_centers=20, radius_km=250.0, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"latitude": rng.uniform(24, 46, n_events),
+                       "longitude": rng.uniform(122, 150, n_events)})
+    lats = rng.uniform(28, 42, n_centers)
+    lons = rng.uniform(128, 145, n_centers)
+
+    def scalar_haversine(lat1, lon1, lat2, lon2):
+        φ1, φ2 = math.radians(lat1), math.radians(lat2)
+        dφ     = math.radians(lat2 - lat1)
+        dλ     = math.radians(lon2 - lon1)
+        a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    t0 = time.perf_counter()
+    scan = []
+    for lat0, lon0 in zip(lats, lons):
+        d = df.apply(lambda r: scalar_haversine(lat0, lon0, r.latitude, r.longitude), axis=1)
+        scan.append(np.flatnonzero(d.to_numpy() <= radius_km))
+    t_scan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = EventIndex(df["latitude"], df["longitude"])
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    hits = index.query_radius(lats, lons, radius_km)
+    t_query = time.perf_counter() - t0
+
+    same = all(np.array_equal(a, b) for a, (b, _) in zip(scan, hits))
+    print(f"{n_events:,} events x {n_centers} centers, radius {radius_km} km")
+    print(f"df.apply scan : {t_scan:.3f} s")
+    print(f"index build   : {t_build:.3f} s, query: {t_query:.3f} s")
+    print(f"speedup       : x{t_scan / (t_build + t_query):.1f}  (same hits: {same})")
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,101 +1,72 @@
 import pandas as pd
 import numpy as np
 import os
-from math import radians, sin, cos, atan2, sqrt, degrees
+from geodesy import haversine_km, azimuth_deg, elevation_angle_deg
+from classify import classify, AZIMUTH_8, DIP_CLASSES
 
 # === 保存先ディレクトリ ===
 output_dir = "/workspaces/固体地球物理学講座/earthquake_data/Arrival_time_checker/classify"
 os.makedirs(output_dir, exist_ok=True)  # ディレクトリがなければ作る
 output_path = os.path.join(output_dir, "station_event_classification.csv")
 
+# 一度に計算する イベント×観測点 の組数（メモリ上限の目安）
+chunk_pairs = 2_000_000
+
 # === CSV読み込み ===
 events_df = pd.read_csv(os.path.join(output_dir,"earthquake_info@sakurajima_add.csv"), parse_dates=["time"])      # event_id,lat,lon,depth_km
 stations_df = pd.read_csv(os.path.join(output_dir,"station_metadata copy.csv"))  # station_name,lat,lon,elevation_m
 
-# === Haversineで距離計算(km) ===
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371.0  # 地球半径(km)
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
-
-# === 方位角(0-360度) ===
-def calculate_azimuth(lat1, lon1, lat2, lon2):
-    dlon = radians(lon2 - lon1)
-    y = sin(dlon) * cos(radians(lat2))
-    x = cos(radians(lat1))*sin(radians(lat2)) - sin(radians(lat1))*cos(radians(lat2))*cos(dlon)
-    az = degrees(atan2(y, x))
-    return (az + 360) % 360
-
-# === 方位分類 ===
-def classify_azimuth(deg):
-    if deg >= 337.5 or deg < 22.5:
-        return "N"
-    elif deg < 67.5:
-        return "NE"
-    elif deg < 112.5:
-        return "E"
-    elif deg < 157.5:
-        return "SE"
-    elif deg < 202.5:
-        return "S"
-    elif deg < 247.5:
-        return "SW"
-    elif deg < 292.5:
-        return "W"
-    else:
-        return "NW"
-
-# === 仰角分類 ===
-def classify_dip(deg):
-    if deg > 45:
-        return "Beneath"
-    elif deg >= 30:
-        return "Middle"
-    else:
-        return "Beside"
-
-# === 計算結果を保存するリスト ===
-results = []
+# === round(x, 1) と同じ丸め（配列） ===
+def round1(x):
+    r = np.round(x, 1)
+    # 10倍がちょうど .5 付近の値だけ Python の round で丸め直す（np.round は誤差で逆に丸めることがある）
+    frac = np.abs(np.abs(x * 10) % 1 - 0.5)
+    for i in zip(*np.nonzero(frac < 1e-6)):
+        r[i] = round(float(x[i]), 1)
+    return r
 
-# === 全イベント × 全観測点 の組み合わせで計算 ===
-for _, e_row in events_df.iterrows():
-    dt = e_row["time"]
-    place = e_row["place"].replace("/", "_").replace(" ", "_")
-    e_lat, e_lon, e_depth = e_row["latitude"], e_row["longitude"], e_row["depth_km"]
-    e_id = f"{dt.year:04d}{dt.month:02d}{dt.day:02d}_{dt.hour:02d}{dt.minute:02d}_{place}"
+# === イベントID（YYYYMMDD_HHMM_地名） ===
+places = events_df["place"].str.replace("/", "_").str.replace(" ", "_")
+event_ids = (events_df["time"].dt.strftime("%Y%m%d_%H%M") + "_" + places).to_numpy()
 
-    for _, s_row in stations_df.iterrows():
-        st_name = s_row["station_name"]
-        st_lat, st_lon = s_row["lat"], s_row["lon"]
+e_lat = events_df["latitude"].to_numpy(dtype=float)
+e_lon = events_df["longitude"].to_numpy(dtype=float)
+e_depth = events_df["depth_km"].to_numpy()
 
-        # 平面距離
-        horiz_km = haversine(st_lat, st_lon, e_lat, e_lon)
-        # 方位角
-        az_deg = calculate_azimuth(st_lat, st_lon, e_lat, e_lon)
-        az_class = classify_azimuth(az_deg)
+st_names = stations_df["station_name"].to_numpy()
+st_lat = stations_df["lat"].to_numpy(dtype=float)
+st_lon = stations_df["lon"].to_numpy(dtype=float)
+n_st = len(st_names)
 
-        # 仰角
-        dip_deg = degrees(atan2(e_depth, horiz_km))
-        dip_class = classify_dip(dip_deg)
+# === 全イベント × 全観測点 を (イベント, 観測点) の行列でまとめて計算し、チャンクごとに書き出す ===
+chunk_events = max(1, chunk_pairs // max(n_st, 1))
+for start in range(0, max(len(events_df), 1), chunk_events):
+    sl = slice(start, start + chunk_events)
+    lat, lon, depth = e_lat[sl, None], e_lon[sl, None], e_depth[sl, None]
 
-        results.append([
-            e_id, st_name,
-            round(az_deg,1), az_class,
-            round(horiz_km,1),
-            e_depth,
-            round(dip_deg,1), dip_class
-        ])
+    # 平面距離・方位角（観測点から見たイベント）・仰角
+    horiz = haversine_km(st_lat, st_lon, lat, lon)
+    az = azimuth_deg(st_lat, st_lon, lat, lon)
+    dip = elevation_angle_deg(depth, horiz)
+    # 深さが欠損のイベントは、分類は従来どおり Beside、仰角の値は欠損のまま書き出す
+    dip_class = classify(dip.ravel(), DIP_CLASSES)
+    dip = np.where(np.isnan(depth), np.nan, dip)
 
-# === DataFrame化してCSV出力 ===
-out_df = pd.DataFrame(results, columns=[
-    "place","station_name",
-    "azimuth_deg","azimuth_class",
-    "distance_km","depth_km",
-    "dip_angle_deg","dip_class"
-])
-out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
+    n_ev = horiz.shape[0]
+    out_df = pd.DataFrame({
+        "place": np.repeat(event_ids[sl], n_st),
+        "station_name": np.tile(st_names, n_ev),
+        "azimuth_deg": round1(az).ravel(),
+        "azimuth_class": classify(az.ravel(), AZIMUTH_8),
+        "distance_km": round1(horiz).ravel(),
+        "depth_km": np.repeat(e_depth[sl], n_st),
+        "dip_angle_deg": round1(dip).ravel(),
+        "dip_class": dip_class,
+    })
+    # 2チャンク目以降はヘッダなし・BOMなしで追記
+    if start == 0:
+        out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
+    else:
+        out_df.to_csv(output_path, index=False, header=False, mode="a", encoding="utf-8")
 
 print("✅ station_event_classification.csv を生成しました！")
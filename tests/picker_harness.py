@@ -0,0 +1,69 @@
+"""Arrival-time-record.py をヘッドレス（Agg）で動かす
+
+設定の保存先・カタログを一時ディレクトリに向け、波形の読み込みを合成波形に差し替えて
+メイン処理を実行する。キー・マウスは matplotlib のイベントを直接送る。
+"""
+import os
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+from matplotlib.backend_bases import KeyEvent, MouseEvent
+from conftest import REPO_DIR
+
+SCRIPT = os.path.join(REPO_DIR, "Arrival-time-record.py")
+SR = 100.0
+
+
+def synthetic_waves(stations, components, missing=()):
+    """3 s と 9 s から振幅の上がる合成波形（missing の成分はなし）"""
+    rng = np.random.default_rng(0)
+    out = {}
+    for st in stations:
+        for c in components:
+            if c in missing:
+                out[f"{st}.{c}"] = None
+                continue
+            x = rng.normal(0, 1, 21000)
+            x[3000:] += 8 * np.sin(np.arange(18000) / 3)
+            x[9000:] += 20 * np.sin(np.arange(12000) / 5)
+            out[f"{st}.{c}"] = (x, SR, 0.0)
+    return out
+
+
+def open_picker(workdir, navigator=True, missing=()):
+    """ピッカーを起動し、スクリプトの名前空間を返す
+
+    ピックの記録・集計 JSON はカレントディレクトリに書かれるので、呼ぶ側で workdir に移っておく。
+    """
+    catalog = os.path.join(workdir, "catalog.csv")
+    pd.DataFrame({"time": ["2025-06-02 01:02:00"], "place": ["SAKURAJIMA"]}).to_csv(catalog, index=False)
+    with open(SCRIPT, encoding="utf-8") as f:
+        src = f.read().split("\n", 1)[1]   # 先頭の %matplotlib widget を除く
+    src = src.replace('csv_path = "/workspaces', f'csv_path = {catalog!r} or "/workspaces', 1)
+    src = src.replace('save_dir = "/workspaces', f'save_dir = {str(workdir)!r} or "/workspaces', 1)
+    src = src.replace("navigator = True", f"navigator = {navigator}", 1)
+    head, main = src.split("# === メイン処理 ===")
+    ns = {"__name__": "arrival_time_record"}
+    exec(compile(head, SCRIPT, "exec"), ns)
+    ns["load_waves"] = lambda event: synthetic_waves(ns["stations"], ns["components"], missing)
+    exec(compile(main, SCRIPT, "exec"), ns)
+    return ns
+
+
+def page_figure(ns):
+    """(図, 3段の軸, ページ)"""
+    if ns["navigator"]:
+        return ns["nav"]["fig"], ns["nav"]["axes"], ns["nav"]["page"]
+    fig, axes = ns["figures"][0]
+    return fig, axes, ns["open_pages"][0]
+
+
+def key(fig, k):
+    fig.canvas.callbacks.process("key_press_event", KeyEvent("key_press_event", fig.canvas, k))
+
+
+def mouse(fig, ax, name, x, button=1):
+    fig.canvas.draw()
+    px, py = ax.transData.transform((x, np.mean(ax.get_ylim())))
+    fig.canvas.callbacks.process(name, MouseEvent(name, fig.canvas, px, py, button=button))
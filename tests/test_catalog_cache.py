@@ -0,0 +1,110 @@
+import os
+import random
+import pandas as pd
+import pytest
+from conftest import load_script
+from test_catalog_decode import catalog_line
+
+ssf = load_script("seis-search-file.py")
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(ssf, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(ssf, "CACHE_DIR", str(tmp_path / "cache"))
+    rng = random.Random(1)
+    for year in (2011, 2012):
+        (tmp_path / f"h{year}").write_bytes(b"\r\n".join(catalog_line(rng, year) for _ in range(500)) + b"\r\n")
+    return tmp_path
+
+
+def cached(path):
+    index = ssf.load_cache_index()
+    return ssf.cache_load(str(path), index), index
+
+
+def test_cache_round_trip(catalog):
+    path = catalog / "h2011"
+    df = ssf.decode_file(str(path))
+    index = ssf.load_cache_index()
+    ssf.cache_store(str(path), df, index)
+    ssf.save_cache_index(index)
+    hit, _ = cached(path)
+    pd.testing.assert_frame_equal(hit, df)
+
+
+def test_touch_without_change_still_hits(catalog):
+    path = catalog / "h2011"
+    index = ssf.load_cache_index()
+    ssf.cache_store(str(path), ssf.decode_file(str(path)), index)
+    ssf.save_cache_index(index)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    hit, index = cached(path)
+    assert hit is not None
+    assert index["files"][str(path)]["mtime_ns"] == st.st_mtime_ns + 10**9
+
+
+@pytest.mark.parametrize("edit", ["same_size", "appended"])
+def test_changed_file_misses(catalog, edit):
+    path = catalog / "h2011"
+    index = ssf.load_cache_index()
+    ssf.cache_store(str(path), ssf.decode_file(str(path)), index)
+    ssf.save_cache_index(index)
+    raw = path.read_bytes()
+    if edit == "same_size":
+        raw = raw[:30] + (b"1" if raw[30:31] != b"1" else b"2") + raw[31:]
+    else:
+        raw += raw[:200]
+    path.write_bytes(raw)
+    assert cached(path)[0] is None
+
+
+def test_version_change_drops_index(catalog, monkeypatch):
+    path = catalog / "h2011"
+    index = ssf.load_cache_index()
+    ssf.cache_store(str(path), ssf.decode_file(str(path)), index)
+    ssf.save_cache_index(index)
+    monkeypatch.setattr(ssf, "_CACHE_VERSION", ssf._CACHE_VERSION + 1)
+    assert cached(path)[0] is None
+
+
+def test_replaced_file_drops_old_npz(catalog):
+    path = catalog / "h2011"
+    index = ssf.load_cache_index()
+    ssf.cache_store(str(path), ssf.decode_file(str(path)), index)
+    old_hash = index["files"][str(path)]["hash"]
+    path.write_bytes(path.read_bytes()[:-300])
+    ssf.cache_store(str(path), ssf.decode_file(str(path)), index)
+    assert not os.path.exists(os.path.join(ssf.CACHE_DIR, old_hash + ".npz"))
+
+
+def test_load_years_uses_cache_and_matches_decode(catalog, capsys):
+    first = ssf.load_years([2011, 2012], n_workers=1)
+    second = ssf.load_years([2011, 2012], n_workers=1)
+    out = capsys.readouterr().out
+    assert out.count("(cache)") == 2
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_search_years_same_with_and_without_cache(catalog, monkeypatch):
+    query = (ssf.SAKURAJIMA_LAT, ssf.SAKURAJIMA_LON, 800.0, 1.0)
+    ssf.load_years([2011, 2012], n_workers=1)          # キャッシュを作る
+    cached_frames, cached_stats = ssf.search_years([2011, 2012], query, n_workers=1)
+    monkeypatch.setattr(ssf, "CACHE_DIR", None)
+    plain_frames, plain_stats = ssf.search_years([2011, 2012], query, n_workers=1)
+    assert cached_stats == plain_stats
+    for a, b in zip(cached_frames, plain_frames):
+        pd.testing.assert_frame_equal(a, b, check_dtype=False)
+
+
+def test_search_years_filters_each_cached_year_before_loading_the_next(catalog, monkeypatch):
+    ssf.load_years([2011, 2012], n_workers=1)
+    calls = []
+    cache_load, search_frame = ssf.cache_load, ssf.search_frame
+    monkeypatch.setattr(ssf, "cache_load", lambda path, index: calls.append("load") or cache_load(path, index))
+    monkeypatch.setattr(ssf, "search_frame", lambda df, q, st: calls.append("filter") or search_frame(df, q, st))
+    ssf.search_years([2011, 2012], (ssf.SAKURAJIMA_LAT, ssf.SAKURAJIMA_LON, 50.0, 6.0), n_workers=1)
+    # 全年を読み込んでから絞り込むのではなく、1年ずつ読み込み → 絞り込み
+    assert calls == ["load", "filter", "load", "filter"]
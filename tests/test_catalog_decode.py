@@ -0,0 +1,73 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load_script
+
+ssf = load_script("seis-search-file.py")
+
+PLACES = ["NEAR TOKARA ISLANDS", "KAGOSHIMA BAY", "桜島付近", "トカラ列島近海", "日向灘"]
+
+
+def catalog_line(rng, year):
+    """JMA 震源ファイルの1行（欠損欄・あり得ない日付・途中で切れた行・J 以外の行も混ぜる）"""
+    mo, d = rng.randint(1, 12), rng.randint(1, 28)
+    if rng.random() < 0.01:
+        mo, d = 2, 31
+    lat_min = rng.choice([f"{rng.randint(0, 5999):4d}", f"{rng.randint(0, 5999):04d}", "    "])
+    lon_min = rng.choice([f"{rng.randint(0, 5999):04d}", f"{rng.randint(0, 999):4d}", "    "])
+    dep = rng.choice([f"{rng.randint(0, 700):3d}"] * 20 + ["   ", "-1 "])
+    mag = rng.choice([f"{rng.randint(0, 70):2d}"] * 20 + ["  ", "-5", "A1"])
+    s = (f"J{year:04d}{mo:02d}{d:02d}{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}"
+         f"{rng.randint(0, 5999):04d} 040{rng.randint(24, 45):3d}{lat_min} 060"
+         f"{rng.randint(122, 150):4d}{lon_min} 080{dep}00 50{mag}v" + " " * 13).encode("shift_jis")
+    s = s[:68].ljust(68) + rng.choice(PLACES).encode("shift_jis").ljust(24)[:24] + b" 12K"
+    if rng.random() < 0.02:
+        s = s[:rng.randint(10, 60)]
+    if rng.random() < 0.02:
+        s = b"U" + s[1:]
+    return s
+
+
+@pytest.fixture
+def year_file(tmp_path):
+    rng = random.Random(0)
+    raw = b"\r\n".join(catalog_line(rng, 2012) for _ in range(3000)) + b"\r\n"
+    path = tmp_path / "h2012"
+    path.write_bytes(raw)
+    return path
+
+
+def per_line_frame(path):
+    with open(path, encoding="shift_jis", errors="ignore") as f:
+        df = pd.DataFrame([ev for ev in map(ssf.parse_fixed_line, f) if ev])
+    df["time"] = df["time"].astype("M8[ns]")
+    return df
+
+
+def test_bulk_decode_matches_per_line_parser(year_file):
+    ref = per_line_frame(year_file)
+    bulk = ssf.restore_depth_dtype(ssf.decode_file(str(year_file)))
+    assert len(ref) > 2500
+    pd.testing.assert_frame_equal(ref, bulk)
+
+
+def test_split_lines_matches_text_mode(year_file):
+    # 途中に CR だけの改行も混ぜる
+    raw = year_file.read_bytes().replace(b"\r\n", b"\r", 5)
+    year_file.write_bytes(raw)
+    with open(year_file, encoding="shift_jis", errors="ignore") as f:
+        text_lines = [line.rstrip("\n") for line in f]
+    assert ssf.split_lines(raw)[:len(text_lines)] == text_lines
+    pd.testing.assert_frame_equal(ssf.decode_bytes(raw), ssf.decode_lines(text_lines))
+
+
+def test_search_keeps_only_events_inside_radius(year_file):
+    query = (ssf.SAKURAJIMA_LAT, ssf.SAKURAJIMA_LON, 500.0, 2.0)
+    found, stats = ssf.search_file(str(year_file), query)
+    ref = per_line_frame(year_file)
+    dist = ssf.haversine_km(ssf.SAKURAJIMA_LAT, ssf.SAKURAJIMA_LON, ref["latitude"], ref["longitude"])
+    expect = ref[(ref["magnitude"] >= 2.0) & (dist <= 500.0)]
+    assert stats["parsed"] == len(ref)
+    assert sorted(found["time"]) == sorted(expect["time"])
+    np.testing.assert_array_less(found["distance_km"], 500.0 + 1e-9)
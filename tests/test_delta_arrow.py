@@ -0,0 +1,78 @@
+import json
+import pandas as pd
+import pytest
+import pick_store as ps
+from test_pick_store import make_clicks, make_classification, write_json
+
+pa = pytest.importorskip("pyarrow")
+
+
+def frames_equal(a, b):
+    """列指向ファイルから読んだ表（category 列）と delta_table の表を比べる"""
+    a = a.copy()
+    for col in ("Station", "Event", "AzimuthClass", "DipClass"):
+        if col in a:
+            a[col] = a[col].astype(object).where(a[col].notna(), None)
+    pd.testing.assert_frame_equal(a, b, check_dtype=False, check_exact=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    clicks = make_clicks()
+    write_json(tmp_path / "c.json", clicks)
+    make_classification(clicks).to_csv(tmp_path / "cls.csv", index=False, encoding="utf-8-sig")
+    conn = ps.open_store(str(tmp_path / "s.sqlite"))
+    ps.sync(conn, str(tmp_path / "c.json"), str(tmp_path / "cls.csv"))
+    return conn, tmp_path
+
+
+def test_load_matches_delta_table(store):
+    conn, tmp_path = store
+    arrow = str(tmp_path / "d.arrow")
+    for raw in (False, True):
+        frames_equal(ps.load_delta_table(conn, arrow, raw=raw), ps.delta_table(conn, raw=raw))
+    frames_equal(ps.load_delta_table(conn, arrow, stations=["v.sft2"]).reset_index(drop=True),
+                 ps.delta_table(conn, stations=["v.sft2"]))
+
+
+@pytest.mark.parametrize("t", [16384.001, 100000.123, 5e6 + 0.007, 0.001])
+def test_pick_times_keep_full_precision(tmp_path, t):
+    write_json(tmp_path / "c.json", {"E1": {"v.ska2": {"left": {"u": t, "n": t + 0.5, "e": None},
+                                                       "right": {"u": None, "n": None, "e": None}}}})
+    conn = ps.open_store(str(tmp_path / "s.sqlite"))
+    ps.sync(conn, str(tmp_path / "c.json"))
+    df = ps.load_delta_table(conn, str(tmp_path / "d.arrow"), raw=True)
+    assert df["left_u"][0] == t
+    assert df["left_n"][0] == t + 0.5
+    assert df["left_n-u"][0] == (t + 0.5) - t
+
+
+def test_old_float32_snapshot_is_rebuilt(store):
+    conn, tmp_path = store
+    arrow = str(tmp_path / "d.arrow")
+    df = ps.delta_table(conn, raw=True, classes=ps.ARROW_CLASSES)
+    # 旧形式：ピック時刻 float32、format なし（世代は今のまま）
+    columns = {c: (pa.array(df[c].astype("category")) if c in ("Station", "Event", "AzimuthClass", "DipClass")
+                   else pa.array(df[c].to_numpy("float32" if c in ps.TIME_COLS else "float64")))
+               for c in df.columns}
+    table = pa.table(columns, metadata={"generation": str(ps.store_generation(conn))})
+    with pa.OSFile(arrow, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    frames_equal(ps.load_delta_table(conn, arrow, raw=True), ps.delta_table(conn, raw=True))
+    assert ps.read_arrow(arrow).schema.field("left_u").type == pa.float64()
+
+
+def test_snapshot_is_rewritten_only_when_store_changes(store):
+    conn, tmp_path = store
+    arrow = tmp_path / "d.arrow"
+    ps.load_delta_table(conn, str(arrow))
+    mtime = arrow.stat().st_mtime_ns
+    ps.load_delta_table(conn, str(arrow))
+    assert arrow.stat().st_mtime_ns == mtime
+    clicks = json.loads((tmp_path / "c.json").read_text(encoding="utf-8"))
+    clicks["NEW"] = {"v.ska2": {"left": {"u": 1.0, "n": 2.0, "e": 3.0}, "right": {"u": None, "n": None, "e": None}}}
+    write_json(tmp_path / "c.json", clicks)
+    ps.sync(conn, str(tmp_path / "c.json"))
+    df = ps.load_delta_table(conn, str(arrow))
+    assert arrow.stat().st_mtime_ns != mtime
+    assert df["Event"].iloc[-1] == "NEW"
@@ -0,0 +1,69 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import REPO_DIR
+from geodesy import EARTH_RADIUS_KM, haversine_km, azimuth_deg, elevation_angle_deg
+
+
+def scalar_haversine(lat1, lon1, lat2, lon2):
+    φ1, φ2 = math.radians(lat1), math.radians(lat2)
+    dφ, dλ = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def scalar_azimuth(lat1, lon1, lat2, lon2):
+    dlon = math.radians(lon2 - lon1)
+    y = math.sin(dlon) * math.cos(math.radians(lat2))
+    x = (math.cos(math.radians(lat1))*math.sin(math.radians(lat2))
+         - math.sin(math.radians(lat1))*math.cos(math.radians(lat2))*math.cos(dlon))
+    return (math.degrees(math.atan2(y, x)) + 360) % 360
+
+
+def test_vectorized_geometry_matches_scalar():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(24, 46, 500), rng.uniform(122, 150, 500)
+    d = haversine_km(31.593, 130.657, lat, lon)
+    az = azimuth_deg(31.593, 130.657, lat, lon)
+    np.testing.assert_allclose(d, [scalar_haversine(31.593, 130.657, a, b) for a, b in zip(lat, lon)], atol=1e-9)
+    np.testing.assert_allclose(az, [scalar_azimuth(31.593, 130.657, a, b) for a, b in zip(lat, lon)], atol=1e-9)
+
+
+def test_elevation_angle_rules():
+    angle = elevation_angle_deg([10.0, np.nan, 5.0, 5.0], [10.0, 3.0, 0.0, np.nan])
+    np.testing.assert_allclose(angle, [45.0, 0.0, 90.0, 90.0])
+
+
+def test_station_event_classification_matches_row_loop(tmp_path, monkeypatch):
+    """全組み合わせの表が、1組ずつ math で計算した値と同じ（深さ欠損は仰角も欠損・分類は Beside）"""
+    rng = np.random.default_rng(1)
+    n = 40
+    events = pd.DataFrame({"time": pd.date_range("2020-01-01", periods=n, freq="7h"),
+                           "latitude": rng.uniform(30, 33, n), "longitude": rng.uniform(129, 132, n),
+                           "depth_km": np.where(rng.random(n) < 0.15, np.nan, rng.integers(0, 200, n)),
+                           "place": rng.choice(["KAGOSHIMA BAY", "NEAR/TOKARA ISLANDS"], n)})
+    stations = pd.DataFrame({"station_name": ["v.ska2", "v.sft2", "v.skd2"],
+                             "lat": [31.59, 31.57, 31.60], "lon": [130.62, 130.70, 130.66]})
+    events.to_csv(tmp_path / "earthquake_info@sakurajima_add.csv", index=False)
+    stations.to_csv(tmp_path / "station_metadata copy.csv", index=False)
+    with open(os.path.join(REPO_DIR, "station_event_classification.py"), encoding="utf-8") as f:
+        src = f.read().replace('output_dir = "/workspaces', f'output_dir = {str(tmp_path)!r} or "/workspaces', 1)
+    monkeypatch.chdir(tmp_path)
+    exec(compile(src, "station_event_classification.py", "exec"), {"__name__": "station_event_classification"})
+    out = pd.read_csv(tmp_path / "station_event_classification.csv", encoding="utf-8-sig")
+
+    rows = []
+    for _, e in events.iterrows():
+        for _, s in stations.iterrows():
+            horiz = scalar_haversine(s["lat"], s["lon"], e["latitude"], e["longitude"])
+            dip = math.degrees(math.atan2(e["depth_km"], horiz))
+            rows.append((round(horiz, 1), round(scalar_azimuth(s["lat"], s["lon"], e["latitude"], e["longitude"]), 1),
+                         round(dip, 1), "Beneath" if dip > 45 else "Middle" if dip >= 30 else "Beside"))
+    ref = pd.DataFrame(rows, columns=["distance_km", "azimuth_deg", "dip_angle_deg", "dip_class"])
+    assert len(out) == n * len(stations)
+    assert out["dip_angle_deg"].isna().sum() == events["depth_km"].isna().sum() * len(stations)
+    pd.testing.assert_frame_equal(out[ref.columns], ref, check_dtype=False)
+    ids = events["time"].dt.strftime("%Y%m%d_%H%M") + "_" + events["place"].str.replace("/", "_").str.replace(" ", "_")
+    assert out["place"].tolist() == np.repeat(ids.to_numpy(), len(stations)).tolist()
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+import pick_store as ps
+from hist_cache import content_key, OutputCache
+from test_pick_store import make_clicks, make_classification, write_json
+from test_delta_arrow import frames_equal
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def store(tmp_path):
+    clicks = make_clicks(seed=3, n_events=60)
+    write_json(tmp_path / "c.json", clicks)
+    make_classification(clicks).to_csv(tmp_path / "cls.csv", index=False, encoding="utf-8-sig")
+    conn = ps.open_store(str(tmp_path / "s.sqlite"))
+    ps.sync(conn, str(tmp_path / "c.json"), str(tmp_path / "cls.csv"))
+    ps.load_delta_table(conn, str(tmp_path / "d.arrow"), raw=True, classes=ps.ARROW_CLASSES)
+    return conn, clicks, tmp_path
+
+
+def assert_patch_matches_rebuild(conn, tmp_path):
+    ps.sync(conn, str(tmp_path / "c.json"), str(tmp_path / "cls.csv"))
+    patched = ps.load_delta_table(conn, str(tmp_path / "d.arrow"), raw=True, classes=ps.ARROW_CLASSES)
+    fresh = ps.open_store(":memory:")
+    ps.sync(fresh, str(tmp_path / "c.json"), str(tmp_path / "cls.csv"))
+    frames_equal(patched, ps.delta_table(fresh, raw=True, classes=ps.ARROW_CLASSES))
+
+
+def test_json_edits_patch_like_a_rebuild(store):
+    conn, clicks, tmp_path = store
+    events = [e for e, ev in clicks.items() if ev]
+    clicks[events[2]][next(iter(clicks[events[2]]))]["right"]["n"] = 77.7
+    del clicks[events[5]]
+    items = list(clicks.items())
+    items.insert(4, ("NEW", {"v.skd2": {"left": {"u": 1.0, "n": 1.25, "e": None},
+                                        "right": {"u": None, "n": None, "e": None}}}))
+    items[0], items[1] = items[1], items[0]
+    write_json(tmp_path / "c.json", dict(items))
+    ps.sync(conn, str(tmp_path / "c.json"))
+    # 作り直すのは変わったイベントの行だけ
+    table = ps.read_arrow(str(tmp_path / "d.arrow"))
+    _, n_fresh = ps._updated_delta(conn, table, int(table.schema.metadata[b"generation"]))
+    assert 0 < n_fresh <= len(clicks[events[2]]) + 1
+    assert_patch_matches_rebuild(conn, tmp_path)
+
+
+def test_classification_edits_patch_like_a_rebuild(store):
+    conn, clicks, tmp_path = store
+    cls = pd.read_csv(tmp_path / "cls.csv", encoding="utf-8-sig")
+    picked = [(e, st) for e, ev in clicks.items() for st in ev]
+    for event, st in picked[:3]:
+        hit = (cls["place"] == event) & (cls["station_name"] == st)
+        cls.loc[hit, "azimuth_class"] = "NW"
+        cls.loc[hit, "depth_km"] = 99.0
+    cls.to_csv(tmp_path / "cls.csv", index=False, encoding="utf-8-sig")
+    assert_patch_matches_rebuild(conn, tmp_path)
+
+
+def test_set_picks_patch_like_a_rebuild(store):
+    conn, clicks, tmp_path = store
+    event = next(iter(clicks))
+    ps.set_picks(conn, event, "v.new", {"left": {"u": 2.0, "n": 2.5, "e": 3.0}, "right": {}})
+    patched = ps.load_delta_table(conn, str(tmp_path / "d.arrow"), raw=True, classes=ps.ARROW_CLASSES)
+    frames_equal(patched, ps.delta_table(conn, raw=True, classes=ps.ARROW_CLASSES))
+
+
+def test_content_key_ignores_row_order_unless_ordered():
+    df = pd.DataFrame({"a": [1.0, 2.0, float("nan")], "b": ["x", "y", "z"]})
+    shuffled = df.iloc[[2, 0, 1]]
+    assert content_key(df, ["a", "b"]) == content_key(shuffled, ["a", "b"])
+    assert content_key(df, ["a", "b"], ordered=True) != content_key(shuffled, ["a", "b"], ordered=True)
+    assert content_key(df, ["a"], "bins", 10) != content_key(df, ["a"], "bins", 20)
+
+
+def test_output_cache_tracks_key_and_file(tmp_path):
+    manifest, out = tmp_path / "manifest.json", tmp_path / "hist.png"
+    cache = OutputCache(str(manifest))
+    assert not cache.is_current(str(out), "k1")
+    out.write_bytes(b"png")
+    cache.mark(str(out), "k1")
+    cache.save()
+    cache = OutputCache(str(manifest))
+    assert cache.is_current(str(out), "k1")
+    assert not cache.is_current(str(out), "k2")
+    out.unlink()
+    assert not cache.is_current(str(out), "k1")
+    manifest.write_text("{broken")
+    assert OutputCache(str(manifest)).keys == {}
@@ -0,0 +1,74 @@
+import json
+import pytest
+from pick_journal import PickJournal, read_journal, apply_record, compact
+
+COMPONENTS = ["u", "n", "e"]
+
+
+def test_append_and_read_back(tmp_path):
+    path = tmp_path / "pick_journal.jsonl"
+    journal = PickJournal(str(path))
+    journal.append("E1", "v.ska2", "left", "u", 1.25)
+    journal.append("E1", "v.ska2", "right", "n", 2.5)
+    journal.close()
+    records = list(read_journal(str(path)))
+    assert [(r["side"], r["comp"], r["time"]) for r in records] == [("left", "u", 1.25), ("right", "n", 2.5)]
+    assert PickJournal(str(path)).n_pending == 2
+
+
+def test_torn_last_line_is_skipped_and_closed(tmp_path):
+    path = tmp_path / "pick_journal.jsonl"
+    journal = PickJournal(str(path))
+    journal.append("E1", "v.ska2", "left", "u", 1.0)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"event_id": "E1", "station": "v.ska2", "si')
+    journal = PickJournal(str(path))
+    assert journal.n_pending == 1
+    # 次の記録が切れた行に繋がらない
+    journal.append("E1", "v.ska2", "left", "n", 2.0)
+    journal.close()
+    assert [r["comp"] for r in read_journal(str(path))] == ["u", "n"]
+
+
+def test_compact_merges_into_existing_files_and_truncates(tmp_path):
+    summary, clicked = tmp_path / "click_table_summary.json", tmp_path / "clicked_times.json"
+    summary.write_text(json.dumps({"E0": {"v.ska2": {"left": {"u": 9.0, "n": None, "e": None},
+                                                     "right": {"u": None, "n": None, "e": None}}},
+                                   "E1": {"v.ska2": {"left": {"u": 1.0, "n": 5.0, "e": None},
+                                                     "right": {"u": None, "n": None, "e": None}}}}))
+    journal = PickJournal(str(tmp_path / "pick_journal.jsonl"))
+    journal.append("E1", "v.ska2", "left", "u", 1.5)
+    journal.append("E1", "v.sft2", "right", "e", 3.0)
+    assert compact(journal, str(summary), str(clicked), COMPONENTS) == 2
+    table = json.loads(summary.read_text())
+    assert table["E0"]["v.ska2"]["left"]["u"] == 9.0
+    assert table["E1"]["v.ska2"]["left"] == {"u": 1.5, "n": 5.0, "e": None}
+    assert table["E1"]["v.sft2"]["right"] == {"u": None, "n": None, "e": 3.0}
+    assert json.loads(clicked.read_text())["E1"]["v.sft2"]["right"]["e"] == [3.0]
+    assert journal.n_pending == 0 and list(read_journal(journal.path)) == []
+    assert compact(journal, str(summary), str(clicked), COMPONENTS) == 0
+
+
+def test_replay_is_idempotent():
+    rec = {"event_id": "E1", "station": "v.ska2", "side": "left", "comp": "u", "time": 1.0}
+    table, clicked = {}, {}
+    apply_record(table, clicked, rec, COMPONENTS)
+    once = json.dumps([table, clicked])
+    apply_record(table, clicked, rec, COMPONENTS)
+    assert json.dumps([table, clicked]) == once
+
+
+def test_picker_replays_journal_then_records_new_station(tmp_path, monkeypatch):
+    pytest.importorskip("obspy")
+    import picker_harness as h
+    monkeypatch.chdir(tmp_path)
+    journal = PickJournal(str(tmp_path / "pick_journal.jsonl"))
+    journal.append("20250602_0102_SAKURAJIMA", "v.ska2", "left", "u", 1.0)
+    journal.close()
+    ns = h.open_picker(tmp_path, navigator=False)
+    assert ns["click_table"]["20250602_0102_SAKURAJIMA"]["v.ska2"]["left"]["u"] == 1.0
+    # 読み戻したイベントの別の観測点のピック
+    ns["record_pick"]("20250602_0102_SAKURAJIMA", "v.skd2", "right", "n", 2.0)
+    assert [r["station"] for r in read_journal(ns["pick_journal_path"])] == ["v.ska2", "v.skd2"]
+    ns["journal"].close()
@@ -0,0 +1,129 @@
+import json
+import random
+import numpy as np
+import pandas as pd
+import pytest
+import pick_store as ps
+
+STATIONS = ["v.ska2", "v.sft2", "v.skd2", "v.skrd"]
+
+
+def make_clicks(seed=0, n_events=40):
+    """click_table_summary.json の形（欠損の成分・ピックのないイベント・観測点の並びの違いを含む）"""
+    rng = random.Random(seed)
+    data = {}
+    for i in range(n_events):
+        stations = rng.sample(STATIONS, rng.randint(0, len(STATIONS)))
+        data[f"2025{i:04d}_0000_SAKURAJIMA"] = {
+            st: {side: {c: (None if rng.random() < 0.2 else round(rng.uniform(0, 200), 3)) for c in ps.COMPONENTS}
+                 for side in ps.SIDES}
+            for st in stations}
+    return data
+
+
+def make_classification(clicks, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for event in clicks:
+        for st in STATIONS:
+            rows.append({"place": event, "station_name": st, "azimuth_deg": round(rng.uniform(0, 360), 1),
+                         "azimuth_class": rng.choice(["N", "E", "S", "W"]), "distance_km": 10.0,
+                         "depth_km": float(rng.randint(0, 20)), "dip_angle_deg": 30.0,
+                         "dip_class": rng.choice(["Beside", "Middle", "Beneath"])})
+    return pd.DataFrame(rows)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+@pytest.fixture
+def store(tmp_path):
+    clicks = make_clicks()
+    write_json(tmp_path / "c.json", clicks)
+    make_classification(clicks).to_csv(tmp_path / "cls.csv", index=False, encoding="utf-8-sig")
+    conn = ps.open_store(str(tmp_path / "s.sqlite"))
+    ps.sync(conn, str(tmp_path / "c.json"), str(tmp_path / "cls.csv"))
+    return conn, clicks, tmp_path
+
+
+def reference_deltas(clicks, classification):
+    cls = classification.drop_duplicates(["station_name", "place"]).set_index(["place", "station_name"])
+    rows = []
+    for event, ev in clicks.items():
+        for st, sd in ev.items():
+            def diff(side, c):
+                a, b = sd[side][c], sd[side]["u"]
+                return np.nan if a is None or b is None else a - b
+            c = cls.loc[(event, st)]
+            rows.append({"Station": st, "Event": event,
+                         "left_n-u": diff("left", "n"), "left_e-u": diff("left", "e"),
+                         "right_n-u": diff("right", "n"), "right_e-u": diff("right", "e"),
+                         "AzimuthClass": c["azimuth_class"], "DipClass": c["dip_class"], "Depth": c["depth_km"]})
+    return pd.DataFrame(rows)
+
+
+def test_json_round_trip_is_exact(store):
+    conn, clicks, tmp_path = store
+    assert any(ev == {} for ev in clicks.values())
+    ps.export_click_json(conn, str(tmp_path / "out.json"))
+    assert (tmp_path / "out.json").read_bytes() == (tmp_path / "c.json").read_bytes()
+
+
+def test_delta_table_matches_reference(store):
+    conn, clicks, tmp_path = store
+    ref = reference_deltas(clicks, pd.read_csv(tmp_path / "cls.csv", encoding="utf-8-sig"))
+    pd.testing.assert_frame_equal(ps.delta_table(conn), ref, check_dtype=False)
+
+
+def test_delta_table_filters(store):
+    conn, clicks, _ = store
+    full = ps.delta_table(conn)
+    north = ps.delta_table(conn, stations=["v.ska2", "v.skd2"], AzimuthClass="N")
+    expect = full[full["Station"].isin(["v.ska2", "v.skd2"]) & (full["AzimuthClass"] == "N")]
+    pd.testing.assert_frame_equal(north, expect.reset_index(drop=True))
+
+
+def test_reimport_rewrites_only_changed_events(store):
+    conn, clicks, tmp_path = store
+    events = [e for e, ev in clicks.items() if ev]
+    clicks[events[0]][next(iter(clicks[events[0]]))]["left"]["u"] = 123.456
+    del clicks[events[1]]
+    write_json(tmp_path / "c.json", clicks)
+    generation = ps.store_generation(conn)
+    assert ps.import_click_json(conn, str(tmp_path / "c.json")) == 2
+    assert ps.store_generation(conn) == generation + 1
+    changed = {e for (e,) in conn.execute("SELECT event FROM changes WHERE generation > ?", (generation,))}
+    assert changed == {events[0], events[1]}
+    ps.export_click_json(conn, str(tmp_path / "out.json"))
+    assert (tmp_path / "out.json").read_bytes() == (tmp_path / "c.json").read_bytes()
+    # 変わっていなければ何もしない
+    assert ps.import_click_json(conn, str(tmp_path / "c.json")) == 0
+    assert ps.store_generation(conn) == generation + 1
+
+
+def test_set_picks_overwrites_and_bumps_generation(store):
+    conn, clicks, tmp_path = store
+    event = next(e for e, ev in clicks.items() if "v.ska2" in ev)
+    generation = ps.store_generation(conn)
+    ps.set_picks(conn, event, "v.ska2", {"left": {"u": 1.0, "n": 2.5}, "right": {}})
+    assert ps.store_generation(conn) == generation + 1
+    out = ps.export_click_json(conn, str(tmp_path / "out.json"))
+    assert out[event]["v.ska2"]["left"]["u"] == 1.0 and out[event]["v.ska2"]["left"]["n"] == 2.5
+    row = ps.delta_table(conn, stations=["v.ska2"], events=[event])
+    assert row["left_n-u"].tolist() == [1.5]
+
+
+def test_classification_reimport_counts_changed_rows(store):
+    conn, clicks, tmp_path = store
+    cls = pd.read_csv(tmp_path / "cls.csv", encoding="utf-8-sig")
+    picked = [(e, st) for e, ev in clicks.items() for st in ev]
+    unpicked = next((e, st) for e in clicks for st in STATIONS if st not in clicks[e])
+    for event, st in [picked[0], picked[1], unpicked]:
+        cls.loc[(cls["place"] == event) & (cls["station_name"] == st), "azimuth_class"] = "NW"
+    cls.to_csv(tmp_path / "cls.csv", index=False, encoding="utf-8-sig")
+    # ピックのない組は数えない
+    assert ps.import_classification_csv(conn, str(tmp_path / "cls.csv")) == 2
+    df = ps.delta_table(conn)
+    assert (df["AzimuthClass"] == "NW").sum() == 2
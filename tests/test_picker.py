@@ -0,0 +1,88 @@
+import json
+import pytest
+
+pytest.importorskip("obspy")
+import picker_harness as h
+
+
+@pytest.fixture(params=[False, True], ids=["figures", "navigator"])
+def picker(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ns = h.open_picker(tmp_path, navigator=request.param)
+    yield ns
+    ns["journal"].close()
+
+
+def candidates(page):
+    return {(side, comp): line for line, side, comp in page["markers"]}
+
+
+def saved(ns, page):
+    ns["save_click_results"]()
+    with open("click_table_summary.json", encoding="utf-8") as f:
+        return json.load(f)[page["event_id"]][page["station"]]
+
+
+def test_accept_all_fills_only_empty_components(picker):
+    fig, axes, page = h.page_figure(picker)
+    h.mouse(fig, axes[0], "button_press_event", 10.0, button=1)
+    h.mouse(fig, axes[1], "button_press_event", 12.0, button=3)
+    n_annotations = len(page["annotations"])
+    h.key(fig, "a")
+    assert page["left"]["u"] == [10.0] and page["right"]["n"] == [12.0]
+    assert page["left"]["n"] and page["right"]["u"]
+    assert len(page["annotations"]) == n_annotations
+    summary = saved(picker, page)
+    assert summary["left"]["u"] == 10.0 and summary["right"]["n"] == 12.0
+    assert summary["right"]["u"] == round(float(candidates(page)[("right", "u")].get_xdata()[0]), 3)
+
+
+def test_click_on_candidate_without_drag_does_not_accept(picker):
+    fig, axes, page = h.page_figure(picker)
+    axes[0].set_xlim(28, 34)   # 候補の縦線が 5 px 以上離れるように拡大
+    x0 = float(candidates(page)[("right", "n")].get_xdata()[0])
+    h.mouse(fig, axes[1], "button_press_event", x0)
+    h.mouse(fig, axes[1], "button_release_event", x0)
+    assert page["right"]["n"] == []
+    assert not any(r["comp"] == "n" for r in picker["read_journal"](picker["pick_journal_path"]))
+
+
+def test_drag_replaces_pick_and_its_annotation(picker):
+    fig, axes, page = h.page_figure(picker)
+    h.mouse(fig, axes[1], "button_press_event", 12.0, button=3)
+    old = page["annotations"][("right", "n")]
+    axes[0].set_xlim(28, 34)
+    x0 = float(candidates(page)[("right", "n")].get_xdata()[0])
+    h.mouse(fig, axes[1], "button_press_event", x0)
+    h.mouse(fig, axes[1], "motion_notify_event", x0 + 1.0)
+    h.mouse(fig, axes[1], "button_release_event", x0 + 1.0)
+    assert page["right"]["n"] != [12.0]
+    assert ("right", "n") not in page["annotations"]
+    assert old.axes is None   # 図から外れている
+    assert saved(picker, page)["right"]["n"] == page["right"]["n"][0]
+
+
+@pytest.mark.parametrize("navigator", [False, True], ids=["figures", "navigator"])
+def test_filter_toggle_without_u_component(tmp_path, monkeypatch, navigator):
+    monkeypatch.chdir(tmp_path)
+    ns = h.open_picker(tmp_path, navigator=navigator, missing=("u",))
+    fig, axes, page = h.page_figure(ns)
+    raw = page["lines"][1].line.get_ydata().copy()
+    h.key(fig, "f")
+    assert ns["show_filtered"] is True
+    assert page["lines"][0] is None
+    assert (page["lines"][1].line.get_ydata() != raw).any()
+    h.key(fig, "f")
+    assert ns["show_filtered"] is False
+    assert "f" not in h.matplotlib.rcParams["keymap.fullscreen"]
+    ns["journal"].close()
+
+
+def test_navigator_keys_when_no_page_could_be_shown(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    ns = h.open_picker(tmp_path, navigator=True, missing=("u", "n", "e"))
+    assert ns["nav"]["index"] == -1
+    h.key(ns["nav"]["fig"], "n")
+    h.key(ns["nav"]["fig"], "b")
+    assert capsys.readouterr().out.count("これ以上イベントはありません") == 3
+    ns["journal"].close()
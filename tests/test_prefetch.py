@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+from waveform_cache import Prefetcher
+
+
+def test_get_prefetches_following_events():
+    loaded = []
+    with Prefetcher(lambda i: loaded.append(i) or i * 10, n_events=5, depth=2) as p:
+        assert p.get(0) == 0
+        assert sorted(p._futures) == [0, 1, 2]
+        assert p.get(2) == 20
+        assert [p._futures[i].result() for i in (3, 4)] == [30, 40]
+        assert sorted(loaded) == [0, 1, 2, 3, 4]
+
+
+def test_load_error_is_raised_from_get():
+    def load(i):
+        raise OSError(f"broken {i}")
+    with Prefetcher(load, n_events=3) as p:
+        with pytest.raises(OSError, match="broken 1"):
+            p.get(1)
+
+
+def test_cache_keeps_at_most_max_events():
+    with Prefetcher(lambda i: i, n_events=20, depth=1, max_events=3) as p:
+        for i in range(10):
+            p.get(i)
+        assert len(p._futures) <= 3
+
+
+def test_close_stops_the_pool():
+    release = threading.Event()
+    p = Prefetcher(lambda i: release.wait(5) and i, n_events=10, depth=3, workers=1)
+    threading.Thread(target=p.get, args=(0,), daemon=True).start()
+    time.sleep(0.1)
+    p.close()
+    release.set()
+    with pytest.raises(RuntimeError):
+        p.get(1)
+
+
+def test_picker_closes_prefetcher_with_its_figure(tmp_path, monkeypatch):
+    pytest.importorskip("obspy")
+    import picker_harness as h
+    from matplotlib.backend_bases import CloseEvent
+    monkeypatch.chdir(tmp_path)
+    ns = h.open_picker(tmp_path, navigator=True)
+    fig = ns["nav"]["fig"]
+    fig.canvas.callbacks.process("close_event", CloseEvent("close_event", fig.canvas))
+    with pytest.raises(RuntimeError):
+        ns["prefetcher"].get(0)
+    ns["journal"].close()
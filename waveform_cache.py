@@ -0,0 +1,201 @@
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import win32
+
+# ===== 波形キャッシュ =====
+# デコード済みの get_data 配列をイベントごとに .npy で保存し、次回からはメモリマップで開く。
+#   <cache_dir>/<event_id>/meta.json        : fingerprint と チャネルごとの サンプリングレート / 開始秒 / ファイル名
+#   <cache_dir>/<event_id>/<station.comp>.npy
+# fingerprint は cnt / ch ファイルの 名前・サイズ・更新時刻（と読み込み範囲）から作り、変わればデコードし直す。
+
+# ===== cnt / ch ファイルの fingerprint =====
+def fingerprint(datadir, ch_filepath, extra=""):
+    h = hashlib.sha1(extra.encode())
+    for path in sorted(glob.glob(os.path.join(datadir, "*cnt"))) + [ch_filepath]:
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+# ===== readwin32 によるデコード =====
+def read_win32(datadir, ch_filepath, keys):
+    """{key: (data, sr, 0.0)}（取れなかったチャネルは None）"""
+    import readwin32
+    filedata = readwin32.ReadWin32(os.path.join(datadir, "*cnt"), ch=ch_filepath)
+    waves = {}
+    for key in keys:
+        try:
+            data, sr = filedata.get_data(key)
+            waves[key] = (data, sr, 0.0)
+        except Exception:
+            waves[key] = None
+    return waves
+
+# ===== キャッシュの読み書き =====
+def _load_meta(event_cache):
+    try:
+        with open(os.path.join(event_cache, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def cache_load(event_cache, fp, keys):
+    """キャッシュから {key: (memmap, sr, start) または None}。未キャッシュのチャネルがあれば None"""
+    meta = _load_meta(event_cache)
+    if meta is None or meta.get("fingerprint") != fp:
+        return None
+    channels = meta["channels"]
+    if any(key not in channels for key in keys):
+        return None
+    waves = {}
+    for key in keys:
+        ent = channels[key]
+        if ent is None:
+            waves[key] = None
+            continue
+        try:
+            waves[key] = (np.load(os.path.join(event_cache, ent["file"]), mmap_mode="r"),
+                          ent["sr"], ent.get("start", 0.0))
+        except (OSError, ValueError):
+            return None
+    return waves
+
+def cache_store(event_cache, fp, waves):
+    """waves を保存（同じ fingerprint の既存チャネルは残し、違えば作り直す）"""
+    os.makedirs(event_cache, exist_ok=True)
+    meta = _load_meta(event_cache)
+    if meta is None or meta.get("fingerprint") != fp:
+        meta = {"fingerprint": fp, "channels": {}}
+    for key, wave in waves.items():
+        if wave is None:
+            meta["channels"][key] = None
+            continue
+        data, sr, start = wave
+        fname = f"{key}.npy"
+        tmp = os.path.join(event_cache, fname + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(data))
+        os.replace(tmp, os.path.join(event_cache, fname))
+        meta["channels"][key] = {"file": fname, "sr": sr.item() if hasattr(sr, "item") else sr,
+                                 "start": float(start)}
+    # meta.json は最後に置き換える（途中で止まっても古い meta のまま）
+    tmp = os.path.join(event_cache, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(event_cache, "meta.json"))
+
+# ===== イベント1つ分の波形（キャッシュ優先） =====
+def _decode(datadir, ch_filepath, keys, reader, window):
+    if reader == "readwin32":
+        return read_win32(datadir, ch_filepath, keys)
+    t_start, t_end = window if window is not None else (None, None)
+    return win32.read_event(datadir, ch_filepath, keys, t_start, t_end)
+
+def load_event_status(datadir, ch_filepath, keys, cache_dir=None, reader="select", window=None):
+    """load_event と同じ読み込みで (waves, キャッシュから読んだか) を返す"""
+    if cache_dir is None:
+        return _decode(datadir, ch_filepath, keys, reader, window), False
+    event_cache = os.path.join(cache_dir, os.path.basename(os.path.normpath(datadir)))
+    fp = fingerprint(datadir, ch_filepath, extra=f"{reader}|{window}")
+    waves = cache_load(event_cache, fp, keys)
+    if waves is not None:
+        return waves, True
+    cache_store(event_cache, fp, _decode(datadir, ch_filepath, keys, reader, window))
+    return cache_load(event_cache, fp, keys), False
+
+def load_event(datadir, ch_filepath, keys, cache_dir=None, reader="select", window=None):
+    """{key: (data, sr, start) または None} を返す（start は記録開始からの秒数）
+
+    reader="select" は keys のチャネルと window=(開始, 終了) の時間帯だけをデコードし、
+    "readwin32" は ReadWin32 で全体をデコードする。
+    cache_dir を指定すると、cnt / ch が変わっていない限りキャッシュの .npy をメモリマップで開く。
+    """
+    return load_event_status(datadir, ch_filepath, keys, cache_dir, reader, window)[0]
+
+# ===== カタログ → 対象イベントのディレクトリの一覧 =====
+def events_from_catalog(df, base_dir):
+    """各行の time / place から {"datadir", "ch_filepath", "time"} のリストを作る"""
+    events = []
+    for _, row in df.iterrows():
+        dt = row["time"]
+        dir_name = f"{dt.strftime('%Y%m%d_%H%M')}_{row['place'].replace(' ', '_')}"
+        datadir = os.path.join(base_dir, dir_name)
+        ch_fname = f"03_02_43_{dt.strftime('%Y%m%d')}.euc.ch"
+        events.append({
+            "datadir": datadir,
+            "ch_filepath": os.path.join(datadir, ch_fname),
+            "time": dt
+        })
+    return events
+
+def select_events(csv_path, base_dir, start_date, end_date, row_range=None):
+    """カタログ CSV から対象のイベントを選ぶ（row_range=(開始, 終了) を指定すると日付範囲より優先）"""
+    df = pd.read_csv(csv_path, parse_dates=["time"])
+    if row_range is not None:
+        df = df.iloc[row_range[0]:row_range[1]]
+    else:
+        df = df[(df["time"] >= pd.to_datetime(start_date)) & (df["time"] <= pd.to_datetime(end_date))]
+    return events_from_catalog(df, base_dir)
+
+def window_around(time, load_window):
+    """発震時刻 time の (前, 後) 秒の範囲 → (開始, 終了) の datetime（load_window が None なら None）"""
+    if load_window is None:
+        return None
+    return ((time + pd.Timedelta(seconds=load_window[0])).to_pydatetime(),
+            (time + pd.Timedelta(seconds=load_window[1])).to_pydatetime())
+
+# ===== 先読み（次の数イベントを裏で読み込む） =====
+class Prefetcher:
+    """get(i) で i 番目のイベントを返し、同時に i+1 .. i+depth 番目をスレッドで読み込んでおく
+
+    load(i) は i 番目のイベントの波形を返す関数。読み込み済み（読み込み中）のイベントは
+    最近使った順に max_events 件まで保持し、それより古いものは捨てる。
+    使い終わったら close() でスレッドを止める（with 文でも使える）。
+    """
+
+    def __init__(self, load, n_events, depth=2, max_events=None, workers=None):
+        self.load = load
+        self.n_events = n_events
+        self.depth = depth
+        self.max_events = max(max_events or 0, depth + 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers or max(depth, 1))
+        self._futures = OrderedDict()
+
+    def _submit(self, i):
+        if i in self._futures:
+            self._futures.move_to_end(i)
+        else:
+            self._futures[i] = self._pool.submit(self.load, i)
+
+    def get(self, i):
+        """i 番目の波形（読み込みで出た例外はそのまま送出）"""
+        self._submit(i)
+        for j in range(i + 1, min(i + 1 + self.depth, self.n_events)):
+            self._submit(j)
+        self._futures.move_to_end(i)
+        # 先読み分と i は残し、古いものから捨てる
+        keep = set(range(i, i + 1 + self.depth))
+        for j in list(self._futures):
+            if len(self._futures) <= self.max_events:
+                break
+            if j not in keep:
+                self._futures.pop(j).cancel()
+        return self._futures[i].result()
+
+    def close(self, wait=False):
+        """まだ始まっていない先読みを取り消し、スレッドを止める（wait=True なら読み込み中の分を待つ）"""
+        for f in self._futures.values():
+            f.cancel()
+        self._futures.clear()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(wait=True)
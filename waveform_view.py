@@ -0,0 +1,165 @@
+import numpy as np
+
+# ===== 表示範囲の min/max 包絡（間引き） =====
+def minmax_envelope(data, sr, start, x0, x1, n_bins):
+    """時刻 [x0, x1] に掛かるサンプルを n_bins 区間に分け、区間ごとの最小・最大を交互に並べる
+
+    サンプル数が 2 × n_bins 以下なら間引かずにそのまま返す（拡大すれば元の分解能で描く）。
+    data は先頭から全部を読む必要はなく、表示範囲のスライスだけを触る（memmap でもよい）。
+    """
+    n = len(data)
+    i0 = max(int(np.floor((x0 - start) * sr)), 0)
+    i1 = min(int(np.ceil((x1 - start) * sr)) + 1, n)
+    if i1 <= i0:
+        return np.empty(0), np.empty(0)
+    seg = np.asarray(data[i0:i1], dtype=float)
+    if len(seg) <= 2 * n_bins:
+        return start + np.arange(i0, i1) / sr, seg
+    k = int(np.ceil(len(seg) / n_bins))
+    m = len(seg) // k * k
+    blocks = [seg[:m].reshape(-1, k)]
+    if m < len(seg):
+        blocks.append(seg[m:][None, :])
+    lo = np.concatenate([np.fmin.reduce(b, axis=1) for b in blocks])
+    hi = np.concatenate([np.fmax.reduce(b, axis=1) for b in blocks])
+    # 区間の先頭時刻に最小・最大の2点（縦線になる）
+    tx = start + (i0 + np.arange(len(lo)) * k) / sr
+    return np.repeat(tx, 2), np.column_stack([lo, hi]).ravel()
+
+# ===== 表示範囲に合わせて間引きし直す波形の線 =====
+class LODLine:
+    """ax に波形を描き、表示範囲 (xlim) が変わるたびに見えている部分だけを描き直す
+
+    描く点数は軸の幅 1 ピクセルあたり約 points_per_px 点まで（0 なら間引かずに全サンプル）。
+    矢印キーなどで拡大して見えるサンプルが少なくなれば、間引かない元の波形になる。
+    """
+
+    def __init__(self, ax, data, sr, start=0.0, points_per_px=2, **plot_kw):
+        self.ax = ax
+        self.data = data
+        self.sr = sr
+        self.start = start
+        self.points_per_px = points_per_px
+        self.t_end = start + (len(data) - 1) / sr
+        tx, yx = self._envelope(start, self.t_end)
+        self.line, = ax.plot(tx, yx, **plot_kw)
+        ax.set_xlim(start, self.t_end)
+        ax.callbacks.connect("xlim_changed", self._on_xlim)
+
+    def _envelope(self, x0, x1):
+        if not self.points_per_px:
+            return self.start + np.arange(len(self.data)) / self.sr, np.asarray(self.data)
+        n_bins = max(int(self.ax.bbox.width * self.points_per_px / 2), 1)
+        return minmax_envelope(self.data, self.sr, self.start, x0, x1, n_bins)
+
+    def _on_xlim(self, ax):
+        if self.points_per_px:
+            self.refresh()
+
+    def refresh(self):
+        x0, x1 = self.ax.get_xlim()
+        self.line.set_data(*self._envelope(x0, x1))
+
+    def set_waveform(self, data, sr, start=0.0, reset_view=True):
+        """同じ線に別の波形を入れる（reset_view なら表示範囲を波形全体に戻す）"""
+        self.data, self.sr, self.start = data, sr, start
+        self.t_end = start + (len(data) - 1) / sr
+        if reset_view:
+            self.ax.set_xlim(start, self.t_end)
+        self.refresh()
+
+# ===== ブリッティング（カーソル・ピック注釈だけを描き直す） =====
+class BlitManager:
+    """波形など動かない部分の画像を保存しておき、登録した注釈だけを上に描いて画面に転送する
+
+    背景は図全体が描き直されたとき（xlim / ylim の変更など）の draw_event で取り直す。
+    ブリットできないバックエンドでは draw_idle に戻る。
+    """
+
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self._bg = None
+        self._artists = []
+        for art in artists:
+            self.add_artist(art)
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self._bg = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        fig = self.canvas.figure
+        for art in self._artists:
+            if art.get_visible():
+                fig.draw_artist(art)
+
+    def add_artist(self, art):
+        art.set_animated(True)
+        self._artists.append(art)
+
+    def remove_artist(self, art):
+        self._artists.remove(art)
+        art.remove()
+
+    def update(self):
+        if self._bg is None or not getattr(self.canvas, "supports_blit", False):
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+# ===== ベンチマーク（カーソル移動1回あたりの描画時間） =====
+def benchmark_cursor(n_samples=360_000, sr=100, n_moves=50, lod_points_per_px=2):
+    import time
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    rng = np.random.default_rng(0)
+    traces = [np.cumsum(rng.standard_normal(n_samples)) for _ in range(3)]
+
+    def make_figure(lod):
+        fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(10, 6), sharex=True)
+        cursors = []
+        for ax, y in zip(axes, traces):
+            if lod:
+                LODLine(ax, y, sr, points_per_px=lod_points_per_px, color="black")
+            else:
+                ax.plot(np.arange(n_samples) / sr, y, color="black")
+            cursors.append(ax.annotate("", xy=(0, 0), xytext=(20, 20), textcoords="offset points",
+                                       bbox=dict(boxstyle="round", fc="w"),
+                                       arrowprops=dict(arrowstyle="->")))
+        fig.canvas.draw()
+        return fig, axes, cursors
+
+    def move(cursor, ax, k):
+        x = ax.get_xlim()[0] + (k + 0.5) / n_moves * np.diff(ax.get_xlim())[0]
+        cursor.xy = (x, 0)
+        cursor.set_text(f"{x:.3f} s")
+
+    results = {}
+    for name, lod, blit in [("full redraw", False, False), ("LOD redraw", True, False),
+                            ("LOD + blit", True, True)]:
+        fig, axes, cursors = make_figure(lod)
+        blitter = BlitManager(fig.canvas, cursors) if blit else None
+        if blit:
+            fig.canvas.draw()
+        t0 = time.perf_counter()
+        for k in range(n_moves):
+            move(cursors[0], axes[0], k)
+            if blitter is not None:
+                blitter.update()
+            else:
+                fig.canvas.draw()
+        results[name] = (time.perf_counter() - t0) / n_moves
+        plt.close(fig)
+
+    print(f"{n_samples:,} samples x 3 traces, {n_moves} cursor moves (Agg)")
+    for name, dt in results.items():
+        print(f"{name:12s}: {dt * 1000:7.2f} ms / move")
+
+if __name__ == "__main__":
+    benchmark_cursor()
@@ -0,0 +1,150 @@
+import glob
+import os
+from datetime import datetime, timedelta
+import numpy as np
+
+# ===== WIN32 フォーマット（必要なチャネル・時間帯だけ読む） =====
+# ファイルヘッダ 4 byte、以降は秒ブロックの繰り返し（すべてビッグエンディアン）
+#   秒ブロックヘッダ 16 byte : 日時 BCD 8 byte (YYYY MM DD hh mm ss + 予備) / フレーム長 [0.1ms] 4 byte / データ長 4 byte
+#   チャネルブロック         : 組織ID 1 / 網ID 1 / チャネル番号 2 / サンプルサイズ 4bit + サンプリングレート 12bit
+#                              / 先頭サンプル 4 byte / 差分 (サンプルサイズ × (サンプリングレート - 1))
+# 範囲外の秒ブロックはヘッダだけ読んで seek で飛ばし、不要なチャネルブロックは長さだけ計算して飛ばす。
+
+FILE_HEADER_BYTES = 4
+BLOCK_HEADER_BYTES = 16
+CHANNEL_HEADER_BYTES = 10
+
+# ===== チャネル表 (.ch) → {"station.comp": チャネル番号} =====
+def read_channel_table(ch_filepath):
+    table = {}
+    with open(ch_filepath, "r", encoding="euc-jp", errors="replace") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            cols = line.split()
+            if len(cols) < 5:
+                continue
+            table[f"{cols[3]}.{cols[4]}".lower()] = int(cols[0], 16)
+    return table
+
+# ===== 秒ブロックヘッダ =====
+def _bcd(b):
+    return (b >> 4) * 10 + (b & 0x0F)
+
+def _block_time(header):
+    y = _bcd(header[0]) * 100 + _bcd(header[1])
+    return datetime(y, _bcd(header[2]), _bcd(header[3]),
+                    _bcd(header[4]), _bcd(header[5]), _bcd(header[6]))
+
+def iter_second_blocks(path):
+    """(日時, フレーム長[s], データ先頭位置, データ長) を順に返す（データ部は読まない）"""
+    with open(path, "rb") as f:
+        f.seek(FILE_HEADER_BYTES)
+        pos = FILE_HEADER_BYTES
+        while True:
+            header = f.read(BLOCK_HEADER_BYTES)
+            if len(header) < BLOCK_HEADER_BYTES:
+                return
+            frame = int.from_bytes(header[8:12], "big") / 10000
+            length = int.from_bytes(header[12:16], "big")
+            pos += BLOCK_HEADER_BYTES
+            yield _block_time(header), frame, pos, length
+            pos += length
+            f.seek(pos)
+
+def recording_start(cnt_paths):
+    """最初の cnt ファイルの先頭秒ブロックの日時（readwin32 の時刻 0 に相当）"""
+    for path in cnt_paths:
+        for t, _, _, _ in iter_second_blocks(path):
+            return t
+    return None
+
+# ===== チャネルブロック =====
+def _diff_bytes(size, sr):
+    return sr // 2 if size == 0 else size * (sr - 1)
+
+def _decode_samples(buf, pos, size, sr):
+    first = int.from_bytes(buf[pos:pos + 4], "big", signed=True)
+    raw = np.frombuffer(buf, dtype=np.uint8, count=_diff_bytes(size, sr), offset=pos + 4)
+    if size == 0:
+        # 4bit 差分（上位ニブルが先）
+        nib = np.empty(raw.size * 2, dtype=np.int8)
+        nib[0::2] = raw >> 4
+        nib[1::2] = raw & 0x0F
+        diff = np.where(nib >= 8, nib - 16, nib)[:sr - 1]
+    elif size == 1:
+        diff = raw.view(np.int8)
+    elif size == 2:
+        diff = raw.view(">i2")
+    elif size == 3:
+        b = raw.reshape(-1, 3).astype(np.int32)
+        diff = (b[:, 0] << 16) | (b[:, 1] << 8) | b[:, 2]
+        diff = np.where(diff >= 1 << 23, diff - (1 << 24), diff)
+    elif size == 4:
+        diff = raw.view(">i4")
+    else:
+        raise ValueError(f"unsupported WIN32 sample size: {size}")
+    out = np.empty(sr, dtype=np.int64)
+    out[0] = first
+    np.cumsum(diff, out=out[1:])
+    out[1:] += first
+    return out
+
+# ===== 選択読み込み =====
+def read_selected(cnt_paths, ch_filepath, keys, t_start=None, t_end=None):
+    """keys のチャネルを [t_start, t_end] に掛かる秒ブロックだけデコードする
+
+    戻り値は {key: (data, sr, start) または None}。start は記録開始（最初の秒ブロック）からの
+    秒数で、全体をデコードしたときと同じ時間軸でピックを付けられる。
+    抜けている秒は NaN で埋める。値はカウント値。
+    """
+    table = read_channel_table(ch_filepath)
+    wanted = {table[k]: k for k in keys if k in table}
+    t0_rec = recording_start(cnt_paths)
+    if t0_rec is None:
+        return {key: None for key in keys}
+
+    pieces = {key: [] for key in keys}   # (秒ブロック日時, サンプル)
+    rates = {}
+    for path in cnt_paths:
+        with open(path, "rb") as f:
+            for t, frame, pos, length in iter_second_blocks(path):
+                if t_end is not None and t > t_end:
+                    break
+                if t_start is not None and t + timedelta(seconds=frame) <= t_start:
+                    continue
+                f.seek(pos)
+                buf = f.read(length)
+                p = 0
+                while p + CHANNEL_HEADER_BYTES <= len(buf):
+                    ch = int.from_bytes(buf[p + 2:p + 4], "big")
+                    info = int.from_bytes(buf[p + 4:p + 6], "big")
+                    size, sr = info >> 12, info & 0x0FFF
+                    if ch in wanted:
+                        key = wanted[ch]
+                        rates[key] = sr
+                        pieces[key].append((t, _decode_samples(buf, p + 6, size, sr)))
+                    p += CHANNEL_HEADER_BYTES + _diff_bytes(size, sr)
+
+    # すべてのチャネルで共通の時間軸（選択範囲で最初の秒ブロックから）に並べる
+    times = [t for key in keys for t, _ in pieces[key][:1]]
+    if not times:
+        return {key: None for key in keys}
+    t0 = min(times)
+    waves = {}
+    for key in keys:
+        if not pieces[key]:
+            waves[key] = None
+            continue
+        sr = rates[key]
+        n_sec = int((pieces[key][-1][0] - t0).total_seconds()) + 1
+        data = np.full(n_sec * sr, np.nan)
+        for t, samples in pieces[key]:
+            i = int((t - t0).total_seconds()) * sr
+            data[i:i + sr] = samples
+        waves[key] = (data, sr, (t0 - t0_rec).total_seconds())
+    return waves
+
+def read_event(datadir, ch_filepath, keys, t_start=None, t_end=None):
+    return read_selected(sorted(glob.glob(os.path.join(datadir, "*cnt"))), ch_filepath,
+                         keys, t_start, t_end)